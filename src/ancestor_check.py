@@ -0,0 +1,125 @@
+#!/usr/bin/python
+
+"""
+Check of the ancestor index (ancestor_index.py) and the synset similarity
+matrix (synset_similarity.py) against NLTK's Synset.path_similarity.
+
+Compares the path similarity of random pairs of noun synsets, and SYN_DIS's
+max_similarities for random sentences, both for words in the matrix and
+for words outside it, and prints the number of mismatches (which should be 0).
+By default the noun synsets of WordNet are used. With --synthetic, a random
+hierarchy with several roots and instance hypernyms is generated instead,
+made of NLTK Synsets so that NLTK's own code computes the reference
+(this needs no WordNet data).
+
+Running example:
+python src/ancestor_check.py 10000
+python src/ancestor_check.py --synthetic
+"""
+
+import sys
+import random
+
+from nltk.corpus.reader.wordnet import Synset, WordNetError
+
+from ancestor_index import AncestorIndex
+from synset_similarity import SimilarityIndex, first_sense
+from synset_table import value
+
+class GeneratedReader(object):
+    def get_version(self):
+        return '3.0'    # No fake root for nouns, as in WordNet 2.0 and later
+
+class GeneratedSynset(Synset):
+    """
+    Noun synset of a generated hierarchy.
+    """
+    def __init__(self, reader, name):
+        Synset.__init__(self, reader)
+        self._name = name
+        self._pos = 'n'
+        self.related = {'@':[], '@i':[]}
+
+    def _related(self, relation_symbol, sort=True):
+        return self.related.get(relation_symbol, [])
+
+class GeneratedWordNet(object):
+    """
+    Random hierarchy of size synsets w0.n.01, w1.n.01, .. below roots roots.
+    """
+    def __init__(self, size, roots=3, seed=0):
+        generator = random.Random(seed)
+        reader = GeneratedReader()
+        self.synsets = [GeneratedSynset(reader, 'w{0}.n.01'.format(i)) for i in xrange(size)]
+        for i, synset in enumerate(self.synsets[roots:], roots):
+            parents = generator.sample(self.synsets[:i], generator.choice([1, 1, 1, 2, 3]))
+            if generator.random() < 0.1:
+                synset.related['@i'] = parents[:1]
+                parents = parents[1:]
+            synset.related['@'] = parents
+        self.names = dict((synset.name(), synset) for synset in self.synsets)
+
+    def synset(self, name):
+        if name not in self.names:
+            raise WordNetError(name)
+        return self.names[name]
+
+    def all_synsets(self, pos):
+        return iter(self.synsets)
+
+def reference_similarities(wn, sentence_a, sentence_b):
+    """
+    max_similarities computed with NLTK, word by word.
+    """
+    def similarity(word_a, word_b):
+        synset_a, synset_b = first_sense(wn, word_a), first_sense(wn, word_b)
+        if synset_a is None or synset_b is None:
+            return 0.0
+        return synset_a.path_similarity(synset_b) or 0.0
+    return [max([0.0] + [similarity(word_a, word_b) for word_b in sentence_b]) for word_a in sentence_a]
+
+def check(wn, samples, seed=0):
+    generator = random.Random(seed)
+    synsets = list(wn.all_synsets('n'))
+
+    mismatches = 0
+    ancestors = AncestorIndex()
+    for _ in xrange(samples):
+        synset_a, synset_b = generator.choice(synsets), generator.choice(synsets)
+        if ancestors.path_similarity(synset_a, synset_b) != synset_a.path_similarity(synset_b):
+            print 'path_similarity', value(synset_a.name), value(synset_b.name)
+            mismatches += 1
+    print 'path_similarity: {0} pairs, {1} mismatches'.format(samples, mismatches)
+
+    # Corpus words are in the matrix, the others are looked up when needed
+    words = [value(synset.name).split('.')[0] for synset in generator.sample(synsets, min(len(synsets), 1000))]
+    words += ['not_a_word']
+    index = SimilarityIndex()
+    index.add(words[:len(words)//2], wn)
+
+    sentence_mismatches = 0
+    sentences = samples // 10
+    for _ in xrange(sentences):
+        sentence_a = [generator.choice(words) for _ in xrange(generator.randint(1, 8))]
+        sentence_b = [generator.choice(words) for _ in xrange(generator.randint(1, 8))]
+        missing = [word for word in set(sentence_a) | set(sentence_b) if word not in index]
+        if missing:
+            index.lookup(missing, wn)
+        if index.max_similarities(sentence_a, sentence_b) != reference_similarities(wn, sentence_a, sentence_b):
+            print 'max_similarities', sentence_a, sentence_b
+            sentence_mismatches += 1
+    print 'max_similarities: {0} sentence pairs, {1} mismatches'.format(sentences, sentence_mismatches)
+
+    return mismatches + sentence_mismatches
+
+def main(args):
+    if '--synthetic' in args:
+        args.remove('--synthetic')
+        wn = GeneratedWordNet(2000)
+    else:
+        from nltk.corpus import wordnet as wn
+    samples = int(args[0]) if args else 10000
+    return check(wn, samples)
+
+if __name__ == '__main__':
+    sys.exit(1 if main(sys.argv[1:]) else 0)
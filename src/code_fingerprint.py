@@ -0,0 +1,127 @@
+#!/usr/bin/python
+
+"""
+Fingerprints of code, for caches that must be rebuilt when the code producing them changes.
+
+The fingerprint of a function covers its bytecode, constants and names,
+and, following the global names it uses, the code of all functions, classes
+(with their methods) and LazyResource loaders in the modules of this directory
+that it refers to, directly or through other ones, as well as their UPPER_CASE
+constants (e.g. SENSES). So the helpers of a feature do not have to be listed.
+Modules outside this directory (numpy, nltk, ..) are not followed, and neither
+is config: settings are listed explicitly where they matter.
+"""
+
+import os
+import sys
+import types
+import hashlib
+
+from lazy import LazyResource
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+IGNORED_MODULES = ('config',)
+
+def is_local(module):
+    """
+    Whether module is one of the modules of this directory.
+    """
+    path = getattr(module, '__file__', None)
+    return (path is not None and module.__name__ not in IGNORED_MODULES and
+            os.path.dirname(os.path.abspath(path)) == SOURCE_DIR)
+
+def hash_code(md5, code):
+    """
+    Hash a code object (bytecode, constants and names, not line numbers),
+    including the code of nested functions.
+    """
+    md5.update(code.co_code)
+    md5.update(repr(code.co_names))
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            hash_code(md5, const)
+        else:
+            md5.update(repr(const))
+
+def code_names(code, names=None):
+    """
+    Return the set of global and attribute names used by code, and by the functions nested in it.
+    """
+    if names is None:
+        names = set()
+    names.update(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            code_names(const, names)
+    return names
+
+def is_constant(name, value):
+    return name.isupper() and isinstance(value, (int, long, float, basestring, tuple, list, frozenset))
+
+def references(obj, md5):
+    """
+    Hash obj (a function or class) into md5, and return the objects it refers to.
+    """
+    if isinstance(obj, (type, types.ClassType)):
+        md5.update(repr((obj.__module__, obj.__name__)))
+        refs = list(obj.__bases__)
+        for value in obj.__dict__.values():
+            if isinstance(value, (staticmethod, classmethod)):
+                value = value.__get__(None, obj)
+            elif isinstance(value, property):
+                value = (value.fget, value.fset, value.fdel)
+            refs.append(value)
+        return refs
+
+    function = getattr(obj, 'im_func', obj)
+    hash_code(md5, function.func_code)
+    names = code_names(function.func_code)
+    refs = [cell.cell_contents for cell in function.func_closure or ()]
+    refs.extend(function.func_defaults or ())
+    for name in sorted(names):
+        if name not in function.func_globals:
+            continue
+        value = function.func_globals[name]
+        if isinstance(value, types.ModuleType):
+            if is_local(value):
+                for attr in sorted(names):
+                    attr_value = getattr(value, attr, None)
+                    if is_constant(attr, attr_value):
+                        md5.update(repr((attr, attr_value)))
+                    else:
+                        refs.append(attr_value)
+        elif is_constant(name, value):
+            md5.update(repr((name, value)))
+        else:
+            refs.append(value)
+    return refs
+
+def fingerprint(objects):
+    """
+    Return the md5 hex digest of the code of objects (functions, classes or LazyResources),
+    and of everything in this directory they refer to.
+    """
+    digests = []
+    seen = {}   # id -> object, kept so that the ids are not reused
+    stack = list(objects)
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen[id(obj)] = obj
+
+        if isinstance(obj, LazyResource):
+            stack.append(obj.loader)
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (types.FunctionType, types.MethodType, type, types.ClassType)):
+            if not is_local(sys.modules.get(obj.__module__)):
+                continue
+            md5 = hashlib.md5()
+            stack.extend(references(obj, md5))
+            digests.append(md5.hexdigest())
+
+    # Independent of the order in which the code was found
+    return hashlib.md5(''.join(sorted(digests))).hexdigest()
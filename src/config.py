@@ -3,22 +3,36 @@
 """
 Parameters for semeval task 1
 """
-import os
 
 # Parameters
 DEBUG = True            # More informative print-outs
 USE_BIGRAMS = False     # Use bigrams for the DSM (Slightly worse results when this is switched on)
 USE_TRIGRAMS = True     # Use trigrams for the DSM
-RECALC_FEATURES = True  # Remember to switch this to True if features are changed
+MAX_PHRASE_LENGTH = 3   # Longest phrases (word1_.._wordn) used for the DSM, lengths > 3 are always used
+RECALC_FEATURES = False # Recompute all features, also the cached ones (changed features are always recomputed)
 WRITE_TO_MESH = False    # Write to mesh (ann)
 POST_PROCESS = False    # Post-process by making sure values are between 1.0 and 5.0
 USE_BOXER = False        # Use boxer features
 WRITE_COMPLEXITY = False # Write DRS complexity
+USE_EMBEDDING_SUBSET = True # Only load the embeddings of words/phrases in the sick data (extended when the data changes)
+EMBEDDING_PRECISION = 'full' # Precision of the embeddings: 'full', 'float16' or 'int8' (see embedding_report.py)
+NUM_WORKERS = None      # Number of worker processes for parallel steps (None: one per core)
+CACHE_FINGERPRINT = 'mtime' # How cached pairs are checked for changes: 'mtime' (size and mtime) or 'content' (md5 hash)
 
 # Paths
 shared_sick = './working/sick/'    # Directory containing sick files
 shared_sick2 = './working/sick2/'   # Directory containing alternate sick files
 working_path = './working/'               # Directory containing word embeddings
+embedding_store = './working/embeddings{0}/'   # Memory-mapped embedding store (one per vector_num)
+embedding_subset = './working/embeddings{0}.sick/'   # Embedding store restricted to the sick data
+sick_archive = 'sick.archive'   # Indexed binary cache of the loaded sick data, stale pairs are re-read
+sick2_manifest = './working/sick2.manifest'  # Index of the alternate sick folders of each pair
+lemma_cache = './working/lemmas.pickle'   # Lemma of each token (started again when WordNet is updated)
+term_index = './working/terms.index'   # Term statistics of the t.tok/h.tok files, updated per changed pair
+synset_table = './working/synset_lemmas.pickle'   # Noun sense lemmas of the corpus words (rebuilt when WordNet is updated)
+synset_similarity = './working/synset_similarity/'   # Path similarities of the first noun senses of the corpus words
+feature_cache = './working/features/'  # Cached feature columns, see feature_cache.py
+corpus_store = './working/corpus/'    # Token ids of all sick sentences, rebuilt when the sick archive changes
 
 # Specify word embedding file to be used
 vector_num = 2
@@ -33,44 +47,3 @@ elif num == 3:
 
 # Temp stop list
 stop_list = set(['a', 'of', 'is', 'the'])    # FIXME: Hard coded stop list
-
-# word counts
-word_freq = {}
-doc_freq = {}
-total_words = 0
-total_sentences = 0
-for id in os.listdir(shared_sick):
-    path = os.path.join(shared_sick, id, 't.tok')
-    if os.path.isfile(path):
-        for line in open(path):
-            total_words += len(line.split())
-            total_sentences += 1
-            for word in line.split():
-                word = word.lower()
-                if word in word_freq:
-                    word_freq[word] += 1
-                else:
-                    word_freq[word] = 1
-            for word in set(line.split()):
-                word = word.lower()
-                if word in doc_freq:
-                    doc_freq[word] += 1
-                else:
-                    doc_freq[word] = 1
-    path = os.path.join(shared_sick, id, 'h.tok')
-    if os.path.isfile(path):
-        for line in open(path):
-            total_words += len(line.split())
-            total_sentences += 1
-            for word in line.split():
-                word = word.lower()
-                if word in word_freq:
-                    word_freq[word] += 1
-                else:
-                    word_freq[word] = 1
-            for word in set(line.split()):
-                word = word.lower()
-                if word in doc_freq:
-                    doc_freq[word] += 1
-                else:
-                    doc_freq[word] = 1
\ No newline at end of file
@@ -0,0 +1,299 @@
+#!/usr/bin/python
+
+"""
+Conversion of word embedding files to an embedding store.
+
+Reads word2vec txt, word2vec bin and GloVe txt files in chunks.
+Txt-files are cut into byte ranges that are parsed in bulk
+by a pool of worker processes. Each finished chunk is saved
+in a parts directory next to the store, so an interrupted
+conversion picks up where it stopped instead of starting over.
+
+Running example:
+python src/convert_embeddings.py working/GoogleNews-vectors-negative300.bin working/embeddings1/
+"""
+
+import os
+import sys
+import mmap
+import json
+import shutil
+import numpy as np
+
+from sys import stdout
+from multiprocessing import Pool
+
+import embedding_store
+import config
+
+CHUNK_BYTES = 64 * 1024 * 1024  # Size of the byte ranges parsed per txt chunk
+BINARY_CHUNK_ROWS = 100000      # Number of rows parsed per bin chunk
+
+def read_header(in_f):
+    """
+    Read the optional 'vocab_size dimensions' header.
+    Returns the dimensionality and the offset at which the vectors start.
+    """
+    first = in_f.readline()
+    fields = first.split()
+    if len(fields) == 2 and fields[0].isdigit() and fields[1].isdigit():
+        # word2vec header
+        return int(fields[1]), in_f.tell()
+
+    # GloVe files have no header, the first line is a vector
+    return len(fields)-1, 0
+
+def text_chunks(in_f, start, size):
+    """
+    Cut a txt-file into byte ranges of about CHUNK_BYTES, ending on line ends.
+    """
+    boundaries = [start]
+    while boundaries[-1] < size:
+        in_f.seek(min(boundaries[-1]+CHUNK_BYTES, size))
+        in_f.readline()
+        boundaries.append(min(in_f.tell(), size))
+
+    return zip(boundaries[:-1], boundaries[1:])
+
+def part_path(parts, num):
+    return os.path.join(parts, 'part{0:05d}'.format(num))
+
+def part_done(part):
+    return os.path.isfile(part+'.vocab')
+
+def read_part_words(part):
+    with open(part+'.vocab') as in_f:
+        words = in_f.read()
+    return words.split('\n') if words else []
+
+def save_part(part, words, vectors, end=None):
+    """
+    Save a parsed chunk. The vocab file is written last and marks the part as done.
+    """
+    with open(part+'.npy.tmp', 'wb') as out_f:
+        np.save(out_f, vectors)
+    os.rename(part+'.npy.tmp', part+'.npy')
+
+    if end is not None:
+        with open(part+'.end', 'w') as out_f:
+            out_f.write(str(end))
+
+    with open(part+'.vocab.tmp', 'w') as out_f:
+        out_f.write('\n'.join(words))
+    os.rename(part+'.vocab.tmp', part+'.vocab')
+
+def parse_lines(lines, dimensions):
+    """
+    Parse a list of 'word v1 .. vn' lines into words and a float32 matrix.
+    If every line has the right number of values (counted by its separators),
+    all values are parsed in one call, otherwise the lines are parsed one by one.
+    """
+    words = []
+    values = []
+    for line in lines:
+        word, _, rest = line.partition(' ')
+        if rest:
+            words.append(word)
+            values.append(rest)
+
+    # A short and a long line would add up to the right total, and shift the rows between them
+    if all(rest.strip().count(' ') == dimensions-1 for rest in values):
+        vectors = np.fromstring(' '.join(values), dtype=np.float32, sep=' ')
+        if vectors.size == len(words)*dimensions:
+            return words, vectors.reshape((len(words), dimensions))
+
+    # Error with embedding file - skip the malformed lines
+    good_words = []
+    good_vectors = []
+    for word, rest in zip(words, values):
+        vector = np.fromstring(rest, dtype=np.float32, sep=' ')
+        if vector.size == dimensions:
+            good_words.append(word)
+            good_vectors.append(vector)
+
+    return good_words, np.array(good_vectors, dtype=np.float32).reshape((len(good_words), dimensions))
+
+def convert_text_chunk(args):
+    """
+    Parse one byte range of a txt-file and save it as a part.
+    Run by the worker processes.
+    """
+    f_name, start, end, dimensions, part = args
+    if not part_done(part):
+        with open(f_name, 'rb') as in_f:
+            in_f.seek(start)
+            lines = in_f.read(end-start).splitlines()
+
+        words, vectors = parse_lines(lines, dimensions)
+        save_part(part, words, vectors)
+
+    return part
+
+def convert_binary_chunk(data, offset, dimensions, part):
+    """
+    Parse up to BINARY_CHUNK_ROWS rows of a memory-mapped word2vec bin-file,
+    starting at offset, and save them as a part.
+    Returns the number of rows parsed and the offset after the last row.
+    """
+    row_bytes = dimensions * np.dtype(np.float32).itemsize
+    words = []
+    starts = []
+    while len(words) < BINARY_CHUNK_ROWS:
+        space = data.find(' ', offset)
+        if space < 0 or space+1+row_bytes > len(data):
+            break
+        # Rows may be separated by a newline
+        words.append(data[offset:space].lstrip('\n'))
+        starts.append(space+1)
+        offset = space+1+row_bytes
+
+    vectors = np.zeros((len(words), dimensions), dtype=np.float32)
+    for i, start in enumerate(starts):
+        vectors[i] = np.frombuffer(data, dtype='<f4', count=dimensions, offset=start)
+
+    save_part(part, words, vectors, offset)
+    return len(words), offset
+
+def read_plan(parts, f_name):
+    """
+    Return the conversion plan stored in the parts directory,
+    or None if there is none or if it was made for a different file.
+    """
+    try:
+        with open(os.path.join(parts, 'plan.json')) as in_f:
+            plan = json.load(in_f)
+    except (IOError, ValueError):
+        return None
+
+    stat = os.stat(f_name)
+    if plan['source'] != os.path.abspath(f_name) or plan['size'] != stat.st_size or plan['mtime'] != stat.st_mtime:
+        return None
+    return plan
+
+def write_plan(parts, f_name, plan):
+    stat = os.stat(f_name)
+    plan.update({'source':os.path.abspath(f_name), 'size':stat.st_size, 'mtime':stat.st_mtime})
+    with open(os.path.join(parts, 'plan.json'), 'w') as out_f:
+        json.dump(plan, out_f)
+
+def convert_text(f_name, parts, plan):
+    """
+    Convert a word2vec or GloVe txt-file to parts, using a pool of workers.
+    """
+    chunks = plan['chunks']
+    jobs = [(f_name, start, end, plan['dimensions'], part_path(parts, i))
+            for i, (start, end) in enumerate(chunks)]
+
+    done = sum(1 for job in jobs if part_done(job[-1]))
+    pool = Pool(config.NUM_WORKERS)
+    try:
+        for _ in pool.imap_unordered(convert_text_chunk, [job for job in jobs if not part_done(job[-1])]):
+            done += 1
+            if config.DEBUG: stdout.write('\rparsed chunk {0}/{1}'.format(done, len(jobs)))
+        pool.close()
+        pool.join()
+    finally:
+        # No workers are left behind if one of them (or the parent) raised
+        pool.terminate()
+
+    return [job[-1] for job in jobs]
+
+def convert_binary(f_name, parts, plan):
+    """
+    Convert a word2vec bin-file to parts.
+    Rows are variable-length, so the file is read sequentially, one chunk at a time.
+    """
+    vocab_size = plan['vocab_size']
+    part_list = []
+    offset = plan['start']
+    rows = 0
+    with open(f_name, 'rb') as in_f:
+        data = mmap.mmap(in_f.fileno(), 0, access=mmap.ACCESS_READ)
+        parsed = BINARY_CHUNK_ROWS
+        while parsed == BINARY_CHUNK_ROWS:
+            part = part_path(parts, len(part_list))
+            if part_done(part):
+                with open(part+'.end') as end_f:
+                    offset = int(end_f.read())
+                parsed = len(read_part_words(part))
+            else:
+                parsed, offset = convert_binary_chunk(data, offset, plan['dimensions'], part)
+            rows += parsed
+            part_list.append(part)
+            if config.DEBUG: stdout.write('\rparsed {0}/{1} rows'.format(rows, vocab_size))
+        data.close()
+
+    return part_list
+
+def merge_parts(part_list, path, dimensions):
+    """
+    Merge the parts into a store at path.
+    Words are lowercased, the id of a word is that of its first occurrence,
+    its vector that of its last occurrence.
+    """
+    word_ids = {}
+    for part in part_list:
+        for word in read_part_words(part):
+            word = word.lower()
+            if word not in word_ids:
+                word_ids[word] = len(word_ids)
+
+    embedding_store.remove_store(path)
+    matrix_file = os.path.join(path, embedding_store.MATRIX_FILE)
+    projections = np.lib.format.open_memmap(matrix_file+'.tmp', mode='w+',
+        dtype=np.float32, shape=(len(word_ids), dimensions))
+
+    for part in part_list:
+        words = [word.lower() for word in read_part_words(part)]
+        vectors = np.load(part+'.npy')
+        ids = np.array([word_ids[word] for word in words], dtype=np.int64)
+
+        # Keep the last occurrence of words that occur twice within the part
+        _, last = np.unique(ids[::-1], return_index=True)
+        last = len(ids) - 1 - last
+        projections[ids[last]] = vectors[last]
+
+    projections.flush()
+    del projections
+    os.rename(matrix_file+'.tmp', matrix_file)
+
+    embedding_store.write_vocab(path, sorted(word_ids, key=word_ids.get))
+
+def convert(f_name, path):
+    """
+    Convert the embedding file f_name to a store at path.
+    Files ending in .bin are read as word2vec bin-files,
+    others as word2vec or GloVe txt-files.
+    """
+    binary = f_name.endswith('.bin')
+    parts = path.rstrip('/')+'.parts'
+    if not os.path.isdir(parts):
+        os.makedirs(parts)
+
+    plan = read_plan(parts, f_name)
+    if plan is None:
+        # No (valid) earlier attempt, start from zero
+        shutil.rmtree(parts)
+        os.makedirs(parts)
+        with open(f_name, 'rb') as in_f:
+            if binary:
+                header = in_f.readline().split()
+                plan = {'vocab_size':int(header[0]), 'dimensions':int(header[1]), 'start':in_f.tell()}
+            else:
+                dimensions, start = read_header(in_f)
+                plan = {'dimensions':dimensions, 'chunks':text_chunks(in_f, start, os.path.getsize(f_name))}
+        write_plan(parts, f_name, plan)
+    elif config.DEBUG:
+        stdout.write('resuming conversion.. ')
+
+    if binary:
+        part_list = convert_binary(f_name, parts, plan)
+    else:
+        part_list = convert_text(f_name, parts, plan)
+
+    if config.DEBUG: stdout.write('\nmerging parts.. ')
+    merge_parts(part_list, path, plan['dimensions'])
+    shutil.rmtree(parts)
+
+if __name__ == '__main__':
+    convert(sys.argv[1], sys.argv[2])
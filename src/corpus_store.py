@@ -0,0 +1,143 @@
+#!/usr/bin/python
+
+"""
+Columnar corpus store for SemEval Shared Task 1.
+
+The sentences of all pairs and their paraphrase variants are kept as
+token ids instead of lists of strings. Every distinct token is stored
+once in a Vocabulary (see vocabulary.py), in sorted order, so a token id
+is its position in the vocabulary. Each column (only the raw tokens are
+stored, as they are what the overlap features compare) is a flat int32
+array of token ids with an offset array marking where each sentence starts.
+
+Sentence 2*i is the t of pair i, sentence 2*i+1 its h. The variants of
+the pairs follow the pairs, variant_offsets gives the variants of each pair.
+All files are .npy files that are memory-mapped, so opening a store does
+not parse anything.
+"""
+
+import os
+import json
+import numpy as np
+
+from collections import namedtuple
+
+import vocabulary
+
+COLUMNS = ('tokens',)
+IDS_FILE = '{0}_ids.npy'
+OFFSETS_FILE = '{0}_offsets.npy'
+VARIANTS_FILE = 'variant_offsets.npy'
+PAIRS_FILE = 'pair_ids.npy'
+SOURCE_FILE = 'source.json'
+
+# The t and h of a pair or variant in one column, like the t/h fields of a PairRecord
+SentencePair = namedtuple('SentencePair', 't h')
+
+def encode(word):
+    if isinstance(word, unicode):
+        return word.encode('utf-8')
+    return word
+
+def get_columns(pair):
+    """
+    Return the sentences of a pair or variant in each column.
+    Missing sentences are stored as empty ones.
+    """
+    return {
+        'tokens': [pair.t or [], pair.h or []],
+    }
+
+def write_store(path, sick_data, source=None):
+    """
+    Write the corpus store of sick_data (a list of PairRecords) at path.
+    source is kept with the store to check whether it is still up to date (see read_source).
+    It is written last, so an interrupted write never leaves a store that can be opened.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+
+    sentences = dict((column, []) for column in COLUMNS)
+    variant_counts = []
+    for pair in sick_data:
+        for column, pair_sentences in get_columns(pair).iteritems():
+            sentences[column] += pair_sentences
+        variant_counts.append(len(pair.variants))
+    for pair in sick_data:
+        for variant in pair.variants:
+            for column, pair_sentences in get_columns(variant).iteritems():
+                sentences[column] += pair_sentences
+
+    words = sorted(set(encode(word) for column in COLUMNS for sentence in sentences[column] for word in sentence))
+    token_ids = dict((word, i) for i, word in enumerate(words))
+    for column in COLUMNS:
+        ids = np.array([token_ids[encode(word)] for sentence in sentences[column] for word in sentence], dtype=np.int32)
+        offsets = np.zeros(len(sentences[column])+1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(sentence) for sentence in sentences[column]])
+        np.save(os.path.join(path, IDS_FILE.format(column)), ids)
+        np.save(os.path.join(path, OFFSETS_FILE.format(column)), offsets)
+
+    variant_offsets = np.zeros(len(sick_data)+1, dtype=np.int64)
+    variant_offsets[1:] = np.cumsum(variant_counts)
+    np.save(os.path.join(path, VARIANTS_FILE), variant_offsets)
+    np.save(os.path.join(path, PAIRS_FILE), np.array([str(pair.id) for pair in sick_data]))
+    vocabulary.write_vocabulary(path, words)
+
+    with open(os.path.join(path, SOURCE_FILE+'.tmp'), 'w') as out_f:
+        json.dump(source, out_f)
+    os.rename(os.path.join(path, SOURCE_FILE+'.tmp'), os.path.join(path, SOURCE_FILE))
+
+def read_source(path):
+    """
+    Return the source written with the store at path, raises IOError if there is no store.
+    """
+    with open(os.path.join(path, SOURCE_FILE)) as in_f:
+        return json.load(in_f)
+
+class CorpusStore(object):
+    """
+    Read access to a corpus store written by write_store.
+    Sentences are returned as int32 arrays of token ids, so overlap features
+    can compare them directly (equal ids mean equal tokens).
+    """
+    def __init__(self, path):
+        read_source(path)
+        self.vocabulary = vocabulary.Vocabulary(path)
+        self.ids = {}
+        self.offsets = {}
+        for column in COLUMNS:
+            self.ids[column] = np.load(os.path.join(path, IDS_FILE.format(column)), mmap_mode='r')
+            self.offsets[column] = np.load(os.path.join(path, OFFSETS_FILE.format(column)), mmap_mode='r')
+        self.variant_offsets = np.load(os.path.join(path, VARIANTS_FILE), mmap_mode='r')
+        self.pair_ids = np.load(os.path.join(path, PAIRS_FILE), mmap_mode='r')
+        self.positions = dict((id, i) for i, id in enumerate(self.pair_ids.tolist()))
+
+    def __len__(self):
+        return len(self.pair_ids)
+
+    def token_ids(self, words):
+        """
+        Return the set of ids of the given words that occur in the corpus.
+        """
+        return set(i for i in (self.vocabulary.index(encode(word)) for word in words) if i >= 0)
+
+    def sentence(self, column, i):
+        offsets = self.offsets[column]
+        return self.ids[column][offsets.item(i):offsets.item(i+1)]
+
+    def pair(self, id, column='tokens'):
+        """
+        Return the t and h of the pair with the given id.
+        """
+        i = self.positions[str(id)]
+        return SentencePair(self.sentence(column, 2*i), self.sentence(column, 2*i+1))
+
+    def variants(self, id, column='tokens'):
+        """
+        Return the t and h of each variant of the pair with the given id.
+        """
+        i = self.positions[str(id)]
+        first = len(self) + self.variant_offsets.item(i)
+        last = len(self) + self.variant_offsets.item(i+1)
+        return [SentencePair(self.sentence(column, 2*j), self.sentence(column, 2*j+1))
+                for j in xrange(first, last)]
@@ -0,0 +1,68 @@
+#!/usr/bin/python
+
+"""
+Report on the effect of the embedding precision on SemEval Shared Task 1.
+
+For each precision (see config.EMBEDDING_PRECISION), print the size of the
+projection matrix, how much the SEN_DIS feature changes compared to full
+precision, and the Pearson/Spearman correlation of the regressor output
+with the gold scores when SEN_DIS is computed at that precision.
+
+Running example:
+python src/embedding_report.py
+"""
+
+import numpy as np
+from scipy.stats import pearsonr, spearmanr
+
+import load_semeval_data
+import feature_extraction
+import embedding_store
+import semeval_task1
+
+def sentence_distances(sick_data, precision):
+    """
+    SEN_DIS for all pairs, using embeddings at the given precision.
+    """
+    word_ids, projections = load_semeval_data.load_embeddings(precision)
+    feature_extraction.embeddings.set((word_ids, projections))
+    feature_extraction.phrase_index.release()
+    feature_extraction.sentence_vectors.clear()
+
+    return projections.nbytes, feature_extraction.sentence_distances([(line.t_lemmas, line.h_lemmas) for line in sick_data])
+
+def main():
+    sick_data = load_semeval_data.load_sick_data()
+    split = 5000
+    sick_train = sick_data[:split]
+    sick_test = [line for line in sick_data[split:] if line.gold is not None]
+    sick_data = sick_train + sick_test
+    test_targets = np.array([float(line.gold) for line in sick_test])
+
+    # Features at full precision, SEN_DIS is replaced per precision below
+    sentence_distances(sick_data, 'full')
+    train_sources = np.array([semeval_task1.get_features(line) for line in sick_train])
+    train_targets = np.array([float(line.gold) for line in sick_train])
+    test_sources = np.array([semeval_task1.get_features(line) for line in sick_test])
+    column = list(semeval_task1.feature_names).index('SEN_DIS')
+
+    print '{0:>8} {1:>12} {2:>12} {3:>12} {4:>9} {5:>9}'.format(
+        'mode', 'matrix MB', 'max diff', 'mean diff', 'pearson', 'spearman')
+    reference = None
+    for precision in embedding_store.PRECISIONS:
+        nbytes, distances = sentence_distances(sick_data, precision)
+        if reference is None:
+            reference = distances
+        diff = np.abs(distances - reference)
+
+        train_sources[:, column] = distances[:split]
+        test_sources[:, column] = distances[split:]
+        regr = semeval_task1.regression(train_sources, train_targets, test_sources, test_targets)
+        outputs = regr.predict(test_sources)
+
+        print '{0:>8} {1:>12.1f} {2:>12.2e} {3:>12.2e} {4:>9.4f} {5:>9.4f}'.format(
+            precision, nbytes / 1024.0**2, np.nanmax(diff), np.nanmean(diff),
+            pearsonr(outputs, test_targets)[0], spearmanr(outputs, test_targets)[0])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/python
+
+"""
+On-disk embedding store for SemEval Shared Task 1.
+
+A store is a directory containing the projection matrix as a .npy file
+and a vocabulary file listing one word per line, in row order,
+which is indexed by a compact Vocabulary (see vocabulary.py).
+The matrix is opened as a read-only np.memmap, so opening a store is
+nearly instant, rows are only paged in when they are looked up,
+and processes using the same store share one copy through the page cache.
+
+Since only the words and phrases occurring in the corpus are ever looked up,
+a much smaller subset store can be written from the full one (see write_subset).
+It keeps the keys it was written for, so that it can be checked for new ones.
+
+A store can also be opened at reduced precision: as float16, or as int8
+with one float32 scale per row. These copies of the matrix are written
+next to the full one the first time they are asked for.
+"""
+
+import os
+import numpy as np
+
+try:
+    from cPickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+
+import vocabulary
+
+MATRIX_FILE = 'matrix.npy'
+VOCAB_FILE = 'vocab.txt'
+KEYS_FILE = 'keys.pickle'
+SCALE_FILE = 'scale.npy'
+PRECISIONS = ('full', 'float16', 'int8')
+
+class QuantizedMatrix(object):
+    """
+    Read-only view on a reduced-precision matrix.
+    Rows are returned as float32, multiplied by their scale if there is one,
+    so code indexing the full matrix can use this instead.
+    """
+    def __init__(self, values, scale=None):
+        self.values = values
+        self.scale = scale
+        self.shape = values.shape
+        self.dtype = np.dtype(np.float32)
+        self.nbytes = values.nbytes + (scale.nbytes if scale is not None else 0)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, rows):
+        values = self.values[rows].astype(np.float32)
+        if self.scale is None:
+            return values
+        scale = self.scale[rows]
+        return values * (scale[..., np.newaxis] if np.ndim(scale) else scale)
+
+def write_store(path, word_ids, projections):
+    """
+    Write word ids and projections to a store at path.
+    The vocabulary file of a previous store is removed first, and the new one
+    is written last, so that an interrupted write never leaves a store that can be opened.
+    """
+    remove_store(path)
+    np.save(os.path.join(path, MATRIX_FILE), projections)
+    write_vocab(path, sorted(word_ids, key=word_ids.get))
+
+def remove_store(path):
+    """
+    Prepare path for a (re)written store: remove the vocabulary file, so that
+    the store cannot be opened until it is complete, and the reduced-precision
+    copies of the previous matrix.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    if os.path.isfile(os.path.join(path, VOCAB_FILE)):
+        os.remove(os.path.join(path, VOCAB_FILE))
+    for precision in PRECISIONS[1:]:
+        matrix_file = os.path.join(path, 'matrix.{0}.npy'.format(precision))
+        if os.path.isfile(matrix_file):
+            os.remove(matrix_file)
+
+def write_vocab(path, words):
+    """
+    Write the vocabulary of the store at path, one word per row,
+    together with its compact index. The vocabulary file is only
+    renamed into place once the index is complete.
+    """
+    vocab_file = os.path.join(path, VOCAB_FILE)
+    if os.path.isfile(vocab_file):
+        os.remove(vocab_file)
+    with open(vocab_file+'.tmp', 'w') as out_f:
+        for word in words:
+            out_f.write(word+'\n')
+
+    vocabulary.write_vocabulary(path, words)
+    os.rename(vocab_file+'.tmp', vocab_file)
+
+def write_subset(path, word_ids, projections, keys, source=None, corpus=None):
+    """
+    Write a store at path holding only the rows of the given keys
+    that are in the vocabulary word_ids. Rows are copied in their original order,
+    so that they are read sequentially from a memory-mapped matrix.
+    The keys (also those that were not found), source, identifying the
+    full store, and corpus, identifying the data the keys were collected from,
+    are kept with the subset (see read_subset_keys).
+    """
+    remove_store(path)
+
+    keys = list(keys)
+    rows = word_ids.lookup(keys)
+    found = np.flatnonzero(rows >= 0)
+    found = found[np.argsort(rows[found], kind='mergesort')]
+
+    np.save(os.path.join(path, MATRIX_FILE), projections[rows[found]])
+    write_subset_keys(path, keys, source, corpus)
+    write_vocab(path, [keys[i] for i in found])
+
+def write_subset_keys(path, keys, source=None, corpus=None):
+    """
+    Write the keys, source and corpus of the subset store at path (see write_subset),
+    e.g. to record that the subset also covers a changed corpus.
+    """
+    with open(os.path.join(path, KEYS_FILE+'.tmp'), 'wb') as out_f:
+        dump((set(keys), source, corpus), out_f, HIGHEST_PROTOCOL)
+    os.rename(os.path.join(path, KEYS_FILE+'.tmp'), os.path.join(path, KEYS_FILE))
+
+def read_subset_keys(path):
+    """
+    Return the keys, source and corpus the subset store at path was written for,
+    raises IOError if they are not known.
+    """
+    try:
+        with open(os.path.join(path, KEYS_FILE), 'rb') as in_f:
+            keys = load(in_f)
+    except (EOFError, UnpicklingError, ValueError):
+        raise IOError('no keys for the embedding subset at {0}'.format(path))
+    # Subsets written without a corpus are checked against the data once
+    return (tuple(keys) + (None,))[:3]
+
+def write_quantized(path, precision):
+    """
+    Write a float16 or int8 (with per-row scale) copy of the matrix at path.
+    """
+    projections = np.load(os.path.join(path, MATRIX_FILE), mmap_mode='r')
+    matrix_file = os.path.join(path, 'matrix.{0}.npy'.format(precision))
+    values = np.lib.format.open_memmap(matrix_file+'.tmp', mode='w+',
+        dtype=precision, shape=projections.shape)
+
+    if precision == 'int8':
+        scale = np.zeros(len(projections), dtype=np.float32)
+
+    # Convert in blocks of rows, so the full matrix is never in memory
+    step = 100000
+    for start in xrange(0, len(projections), step):
+        block = np.asarray(projections[start:start+step], dtype=np.float32)
+        if precision == 'int8':
+            block_scale = np.abs(block).max(axis=1) / 127.0
+            block_scale[block_scale == 0] = 1.0
+            values[start:start+step] = np.round(block / block_scale[:, np.newaxis])
+            scale[start:start+step] = block_scale
+        else:
+            values[start:start+step] = block
+
+    if precision == 'int8':
+        np.save(os.path.join(path, SCALE_FILE), scale)
+    values.flush()
+    del values
+    os.rename(matrix_file+'.tmp', matrix_file)
+
+def open_matrix(path, precision='full'):
+    """
+    Open the matrix of the store at path at the given precision.
+    """
+    if precision == 'full':
+        return np.load(os.path.join(path, MATRIX_FILE), mmap_mode='r')
+    if precision not in PRECISIONS:
+        raise ValueError('unknown embedding precision {0}'.format(precision))
+
+    matrix_file = os.path.join(path, 'matrix.{0}.npy'.format(precision))
+    if not os.path.isfile(matrix_file):
+        write_quantized(path, precision)
+
+    values = np.load(matrix_file, mmap_mode='r')
+    scale = np.load(os.path.join(path, SCALE_FILE), mmap_mode='r') if precision == 'int8' else None
+    return QuantizedMatrix(values, scale)
+
+def open_store(path, precision='full'):
+    """
+    Open the store at path, returning its Vocabulary (word->id)
+    and the memory-mapped projection matrix at the given precision.
+    Raises IOError if there is no (complete) store at path.
+    """
+    vocab_file = os.path.join(path, VOCAB_FILE)
+    if not os.path.isfile(vocab_file):
+        raise IOError('no embedding store at {0}'.format(path))
+
+    if not vocabulary.has_vocabulary(path):
+        # Store written before the vocabulary had an index
+        with open(vocab_file) as in_f:
+            vocabulary.write_vocabulary(path, in_f.read().split('\n')[:-1])
+
+    projections = open_matrix(path, precision)
+    return vocabulary.Vocabulary(path), projections
@@ -0,0 +1,191 @@
+#!/usr/bin/python
+
+"""
+Feature column cache for SemEval Shared Task 1.
+
+Each feature (one or more columns of the feature matrix) is computed for
+all pairs at once and saved as a .npy file in config.feature_cache.
+The file name holds a key over everything the feature depends on:
+* the code of the feature function and of all code it uses (see code_fingerprint.py)
+* its version number (increase it to force recomputation)
+* the config settings it depends on
+* the files it reads besides the pair folders (e.g. working/sick.run)
+* the data its resources are built from (e.g. the embedding store, WordNet)
+* the pairs (their ids, the fingerprints of their files and of their sick2 variants,
+  and the code reading them)
+So only features that were added, or of which one of these changed,
+are computed again. Stale columns are removed when they are replaced.
+
+Columns are computed by a pool of worker processes, each computing all
+features for a contiguous shard of the pairs. Resources and prepared
+data (e.g. sentence vectors) are loaded before the workers are started,
+so they are shared with the workers instead of being loaded by each of them,
+and the result is the same as computing the columns in one process.
+"""
+
+import os
+import glob
+import hashlib
+import numpy as np
+
+from sys import stdout
+from multiprocessing import Pool, cpu_count
+
+import load_semeval_data
+import code_fingerprint
+import config
+
+class Feature(object):
+    """
+    Feature with the given column names, computed by function(pair),
+    which returns one value, or a list of values if there are several names.
+    prepare(pairs), if given, is called before computing the feature for a list of pairs.
+    batch(pairs), if given, computes the values for a list of pairs at once, instead of function per pair.
+    """
+    def __init__(self, names, function, settings=(), files=(), resources=(), version=0, prepare=None, batch=None):
+        self.names = names
+        self.function = function
+        self.settings = settings    # Names of config settings
+        self.files = files
+        self.resources = resources  # LazyResources, loaded before the workers start
+        self.version = version
+        self.prepare = prepare
+        self.batch = batch
+
+    def values(self, pair):
+        value = self.function(pair)
+        if len(self.names) == 1:
+            return [float(value)]
+        return [float(v) for v in value]
+
+    def column(self, pairs):
+        """
+        Return the values for pairs, as a matrix with one row per pair.
+        """
+        if self.batch is not None:
+            values = self.batch(pairs)
+        else:
+            values = [self.values(pair) for pair in pairs]
+        return np.array(values, dtype=np.float64).reshape(len(pairs), len(self.names))
+
+def corpus_fingerprint(pairs):
+    """
+    Fingerprint of the pairs, their order, all files in their folders and in the folders
+    of their variants that features read, and the code reading them.
+    """
+    md5 = hashlib.md5()
+    for pair in pairs:
+        md5.update(repr((pair.id, pair.fingerprint,
+                         load_semeval_data.get_fingerprint(pair.folder, load_semeval_data.LAZY_SOURCE_FILES),
+                         load_semeval_data.get_variant_fingerprint(pair.id))))
+    return md5.hexdigest()
+
+def feature_key(feature, corpus):
+    md5 = hashlib.md5()
+    md5.update(code_fingerprint.fingerprint([feature.function, feature.prepare, feature.batch]))
+    md5.update(repr(feature.version))
+    for name in feature.settings:
+        value = getattr(config, name)
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        md5.update(repr((name, value)))
+    for path in feature.files:
+        try:
+            stat = os.stat(path)
+            md5.update(repr((path, stat.st_size, stat.st_mtime)))
+        except OSError:
+            md5.update(repr((path, None)))
+    for resource in feature.resources:
+        md5.update(repr(resource.fingerprint()))
+    md5.update(corpus)
+    return md5.hexdigest()[:16]
+
+def column_path(feature, key='*'):
+    return os.path.join(config.feature_cache, '{0}-{1}.npy'.format(feature.names[0], key))
+
+# Features and pairs to compute, set before the workers are started (so they inherit it)
+worker_state = None
+
+def compute_rows(job):
+    """
+    Compute the rows start..stop-1 of each feature column.
+    Features with a batch function are computed for all rows at once, the others
+    pair by pair, releasing the lazily read fields of each pair (the models of the pair and its variants)
+    once its row is done, so that they are not all kept in memory.
+    """
+    start, stop = job
+    features, pairs = worker_state
+    shard = pairs[start:stop]
+    columns = [feature.column(shard) if feature.batch is not None else
+               np.zeros((len(shard), len(feature.names)), dtype=np.float64) for feature in features]
+
+    single = [i for i, feature in enumerate(features) if feature.batch is None]
+    for row, pair in enumerate(shard):
+        for i in single:
+            columns[i][row] = features[i].values(pair)
+        pair.release()
+    return columns
+
+def compute_columns(features, pairs, workers=None):
+    """
+    Compute the columns of the given features for pairs, sharding the pairs over
+    a pool of worker processes (config.NUM_WORKERS, one per core by default).
+    """
+    global worker_state
+    for feature in features:
+        for resource in feature.resources:
+            resource.get()
+        if feature.prepare is not None:
+            feature.prepare(pairs)
+
+    worker_state = (features, pairs)
+    try:
+        workers = min(workers or config.NUM_WORKERS or cpu_count(), len(pairs))
+        if workers <= 1:
+            return compute_rows((0, len(pairs)))
+
+        size = -(-len(pairs) // (workers*4))
+        jobs = [(start, min(start+size, len(pairs))) for start in xrange(0, len(pairs), size)]
+        pool = Pool(workers)
+        try:
+            shards = pool.map(compute_rows, jobs)
+            pool.close()
+            pool.join()
+        finally:
+            # No workers are left behind if one of them (or the parent) raised
+            pool.terminate()
+    finally:
+        worker_state = None
+
+    # Shards are returned in order
+    return [np.vstack([shard[i] for shard in shards]) for i in xrange(len(features))]
+
+def feature_matrix(features, pairs, recalc=False):
+    """
+    Return the matrix of all features for the pairs, using the cached columns where possible.
+    If recalc is set, all columns are computed again.
+    """
+    if not os.path.isdir(config.feature_cache):
+        os.makedirs(config.feature_cache)
+
+    corpus = corpus_fingerprint(pairs)
+    paths = [column_path(feature, feature_key(feature, corpus)) for feature in features]
+    stale = [i for i, path in enumerate(paths) if recalc or not os.path.isfile(path)]
+
+    if stale:
+        if config.DEBUG: stdout.write('computing features {0}..'.format(', '.join(features[i].names[0] for i in stale)))
+
+        columns = compute_columns([features[i] for i in stale], pairs)
+        for i, column in zip(stale, columns):
+            # Keyed again now that the resources are loaded: a resource built by
+            # this run (e.g. the embedding store) had no source before
+            paths[i] = column_path(features[i], feature_key(features[i], corpus))
+            for path in glob.glob(column_path(features[i])):
+                os.remove(path)
+            with open(paths[i]+'.tmp', 'wb') as out_f:
+                np.save(out_f, column)
+            os.rename(paths[i]+'.tmp', paths[i])
+
+        if config.DEBUG: stdout.write(' done!\n')
+
+    return np.hstack([np.load(path) for path in paths])
@@ -8,20 +8,20 @@ __author__ = 'Johannes Bjerva, and Rob van der Goot'
 __email__  = 'j.bjerva@rug.nl'
 
 import os
-import requests
 import numpy as np
 
+from sys import stdout
 from collections import defaultdict
-from scipy.spatial.distance import cosine
-from scipy.spatial.distance import euclidean
-from scipy.spatial.distance import jaccard
-from nltk.corpus import wordnet as wn
-from nltk.corpus.reader.wordnet import WordNetError
 
 import drs_complexity
 import load_semeval_data
 import config
 import math
+import synset_table
+import synset_similarity
+
+from lazy import LazyResource
+from phrase_index import PhraseIndex
 
 def id(id):
     score = float(id)/10000.0
@@ -33,12 +33,24 @@ def id2(id):
     else:
         return float(id[0])
 
-def word_overlap2(sentence_a, sentence_b):
+def token_set(sentence):
+    """
+    Return the set of words (or token ids) in a sentence.
+    """
+    if isinstance(sentence, np.ndarray):
+        sentence = sentence.tolist()
+    return set(sentence)
+
+def word_overlap2(sentence_a, sentence_b, stop_list=None):
     """
     Calculate the word overlap of two sentences.
+    The sentences can be lists of words, or arrays of token ids from the corpus store,
+    the stop list (default: config.stop_list) should be of the same kind.
     """
-    a_set = set(word for word in sentence_a) - config.stop_list
-    b_set = set(word for word in sentence_b) - config.stop_list
+    if stop_list is None:
+        stop_list = config.stop_list
+    a_set = token_set(sentence_a) - stop_list
+    b_set = token_set(sentence_b) - stop_list
     score = len(a_set&b_set)/float(len(a_set|b_set))# len(s1&s2)/max(len(s1),len(s2))
     score = (len(a_set|b_set)-len(b_set))/len(a_set) #8337
 
@@ -48,14 +60,14 @@ def word_overlap3(t_raw, h_raw, replacements):
     """
     Calculate the word overlap of two sentences and tries to use paraphrases to get a higher score
     """
-    t_set = set(word for word in t_raw) #- config.stop_list
-    h_set = set(word for word in h_raw) #- config.stop_list
+    t_set = token_set(t_raw) #- config.stop_list
+    h_set = token_set(h_raw) #- config.stop_list
     score = len(t_set & h_set) / float(len(t_set|h_set))    
     highestscore = 0
 
     for replacement in replacements:
-        t_set = set(word for word in replacement[2]) #- config.stop_list # replacement[1] = t_raw
-        h_set = set(word for word in replacement[3]) #- config.stop_list # replacement[2] = h_raw
+        t_set = token_set(replacement.t) #- config.stop_list
+        h_set = token_set(replacement.h) #- config.stop_list
         newScore = len(t_set & h_set) / float(len(t_set|h_set))
         if newScore > highestscore:
             highestscore = newScore
@@ -68,58 +80,103 @@ def sentence_lengths(sentence_a, sentence_b):
     """
     return abs(len(sentence_a)-len(sentence_b))/float(min(len(sentence_a),len(sentence_b)))
       
-def bigrams(sentence):
+def phrase_lengths():
+    """
+    Since the skipgram model includes phrases (word1_word2, word1_word2_word3, ..),
+    look for them. These are the phrase lengths that are used.
+    """
+    lengths = set(xrange(4, config.MAX_PHRASE_LENGTH+1))
+    if config.USE_BIGRAMS: lengths.add(2)
+    if config.USE_TRIGRAMS: lengths.add(3)
+    return lengths
+
+def load_phrase_index():
+    """
+    Open the phrase index of the vocabulary of the embeddings, building it if needed.
     """
-    Since the skipgram model includes bigrams, look for them.
-    These are represented as word1_word2.
+    word_ids, _ = embeddings.get()
+    return PhraseIndex(word_ids, config.MAX_PHRASE_LENGTH)
+
+# Sentence vectors and their norms, keyed by lemma tuple
+sentence_vectors = {}
+
+def cache_sentence_vectors(sentences, batch_size=10000):
     """
-    return [word+'_'+sentence[i+1] 
-            if word+'_'+sentence[i+1] in word_ids else None 
-                for i, word in enumerate(sentence[:-1])] if config.USE_BIGRAMS else []
+    Compute the vectors of all sentences that are not cached yet.
+    Each distinct word is looked up once, phrases are matched by the phrase index,
+    and each distinct row is gathered once. The sums per sentence (segment sums)
+    are then one sparse product of the sentence x row counts with the gathered rows.
+    """
+    from scipy.sparse import csr_matrix
+
+    word_ids, projections = embeddings.get()
+    phrases = phrase_index.get()
+    lengths = phrase_lengths()
+
+    # Checking each sentence against the cache, rather than taking a set difference
+    # with all cached sentences, keeps a call for one pair cheap
+    unique = [sentence for sentence in set(tuple(sentence) for sentence in sentences)
+              if sentence not in sentence_vectors]
+    for start in xrange(0, len(unique), batch_size):
+        batch = unique[start:start+batch_size]
+
+        words = list(set(word for sentence in batch for word in sentence))
+        word_rows = dict(zip(words, word_ids.lookup(words)))
+
+        rows = []
+        row_counts = []
+        for sentence in batch:
+            sentence_rows = [word_rows[word] for word in sentence] + phrases.match(sentence, lengths)
+            rows.extend(sentence_rows)
+            row_counts.append(len(sentence_rows))
+        segments = np.repeat(np.arange(len(batch)), row_counts)
+
+        # Unknown words add nothing
+        rows = np.array(rows, dtype=np.int64)
+        known = rows >= 0
+        unique_rows, columns = np.unique(rows[known], return_inverse=True)
 
-def trigrams(sentence):
+        counts = csr_matrix((np.ones(len(columns)), (segments[known], columns)),
+            shape=(len(batch), len(unique_rows)))
+        vectors = counts.dot(np.asarray(projections[unique_rows], dtype=np.float64))
+        norms = np.sqrt((vectors*vectors).sum(axis=1))
+
+        for i, sentence in enumerate(batch):
+            sentence_vectors[sentence] = (vectors[i], norms[i])
+
+def sentence_distances(pairs):
     """
-    Since the skipgram model includes trigrams, look for them.
-    These are represented as word1_word2_word3.
+    Return the cosine distances of a list of (sentence_a, sentence_b) pairs,
+    as one row-wise dot product over the cached sentence vectors.
     """
-    return [word+'_'+sentence[i+1]+'_'+sentence[i+2] 
-            if word+'_'+sentence[i+1]+'_'+sentence[i+2] in word_ids else None 
-                for i, word in enumerate(sentence[:-2])] if config.USE_TRIGRAMS else []
+    cache_sentence_vectors([sentence for pair in pairs for sentence in pair])
+
+    vectors_a, norms_a = zip(*[sentence_vectors[tuple(a)] for a, _ in pairs])
+    vectors_b, norms_b = zip(*[sentence_vectors[tuple(b)] for _, b in pairs])
+    dots = (np.array(vectors_a) * np.array(vectors_b)).sum(axis=1)
+
+    # Like scipy's cosine, sentences without any known word give nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 1.0 - dots / (np.array(norms_a) * np.array(norms_b))
 
 def sentence_distance(sentence_a, sentence_b):
-    
     """
     Return the cosine distance between two sentences
     """
-    
-    sent_a = np.sum([projections[word_ids.get(word, 0)] 
-        if word in word_ids else [0] 
-            for word in sentence_a+bigrams(sentence_a)+trigrams(sentence_a)], axis=0)
-    sent_b = np.sum([projections[word_ids.get(word, 0)] 
-        if word in word_ids else [0] 
-            for word in sentence_b+bigrams(sentence_b)+trigrams(sentence_b)], axis=0)
-    
-    
-    return float(cosine(sent_a, sent_b))
+    return float(sentence_distances([(sentence_a, sentence_b)])[0])
     
 def get_synset_overlap(sentence_a, sentence_b):
     """
     Calculate the synset overlap of two sentences.
-    Currently uses the first 5 noun senses.
-    """
-    def synsets(word):
-        sense_lemmas = []
-        for pos in ('n'):#,'a'):
-            for i in xrange(10):
-                try:
-                    sense_lemmas += [lemma.name 
-                        for lemma in wn.synset('{0}.{1}.0{2}'.format(word, pos, i)).lemmas]
-                except WordNetError: 
-                    pass
-        return sense_lemmas
-
-    a_set = set(lemma for word in sentence_a for lemma in synsets(word))
-    b_set = set(lemma for word in sentence_b for lemma in synsets(word))
+    Uses the lemmas of the first 10 noun senses of each word (see synset_table.py).
+    """
+    table = synset_lemmas.get()
+    missing = [word for word in set(sentence_a) | set(sentence_b) if word not in table]
+    if missing:
+        table.add(missing, wordnet.get())
+
+    a_set = table.lemma_ids(sentence_a)
+    b_set = table.lemma_ids(sentence_b)
     score = len(a_set&b_set)/float(len(a_set|b_set))
     
     return score
@@ -127,30 +184,22 @@ def get_synset_overlap(sentence_a, sentence_b):
 def synset_overlap(sentence_a, sentence_b, replacements):
     score = get_synset_overlap(sentence_a, sentence_b)
     for replacement in replacements:
-        new_score = get_synset_overlap(replacement[2], replacement[3])
+        new_score = get_synset_overlap(replacement.t, replacement.h)
         if new_score > score:
             score = new_score
     return score
 
 def get_synset_distance(sentence_a, sentence_b):
-    def distance(word, sentence_b):
-        try:
-            synset_a = wn.synset('{0}.n.01'.format(word))
-        except WordNetError:
-            return 0.0
-
-        max_similarity = 0.0
-        for word2 in sentence_b:
-            try:
-                similarity = synset_a.path_similarity(wn.synset('{0}.n.01'.format(word2)))
-                if similarity > max_similarity:
-                    max_similarity = similarity
-            except WordNetError:
-                continue
-
-        return max_similarity
-
-    distances = [distance(word, sentence_b) for word in sentence_a]
+    """
+    Average, over the words of sentence_a that are similar to any word of sentence_b,
+    of their highest path similarity (of the first noun senses, see synset_similarity.py).
+    """
+    index = synset_similarities.get()
+    missing = [word for word in set(sentence_a) | set(sentence_b) if word not in index]
+    if missing:
+        index.lookup(missing, wordnet.get())
+
+    distances = index.max_similarities(sentence_a, sentence_b)
     if float(len([1 for i in distances if i > 0.0])) == 0:
         return 0
     return sum(distances)/float(len([1 for i in distances if i > 0.0]))
@@ -158,7 +207,7 @@ def get_synset_distance(sentence_a, sentence_b):
 def synset_distance(sentence_a, sentence_b, replacements):
     score = get_synset_distance(sentence_a, sentence_b)
     for replacement in replacements:
-        new_score = get_synset_distance(replacement[2], replacement[3])
+        new_score = get_synset_distance(replacement.t, replacement.h)
         if new_score > score:
             score = new_score
             
@@ -193,7 +242,7 @@ def instance_overlap(kt_mod, kh_mod, kth_mod, replacements):
     score = get_instance_overlap(kt_mod, kh_mod, kth_mod)
     
     for replacement in replacements:
-        new_score = get_instance_overlap(replacement[6], replacement[7], replacement[8])
+        new_score = get_instance_overlap(replacement.kt_mod, replacement.kh_mod, replacement.kth_mod)
         if new_score > score:
             score = new_score
     return score
@@ -229,79 +278,61 @@ def relation_overlap(kt_mod, kh_mod, kth_mod, replacements):
     """
     score = get_relation_overlap(kt_mod, kh_mod, kth_mod)
     for replacement in replacements:
-        new_score = get_relation_overlap(replacement[6], replacement[7], replacement[8])
+        new_score = get_relation_overlap(replacement.kt_mod, replacement.kh_mod, replacement.kth_mod)
         if new_score > score:
             score = new_score
     return score
 
-def get_nouns(root):
+def get_nouns(tags):
     """
-    Return the list of nouns as found in the boxer xml 'root'
+    Return the list of nouns in the boxer tags (pos tags, lemmas) of a sentence
     """
-    nouns = []
-    for child in root.findall("./xdrs/taggedtokens/tagtoken/tags"):
-        noun = False
-        for grandchildren in child.findall("./tag[@type='pos']"):
-            if grandchildren.text == 'NN' or grandchildren.text == 'NNS':
-                noun = True
-        if noun == True:
-            for grandchildren in child.findall("./tag[@type='lemma']"):
-                nouns.append(grandchildren.text)
-    return nouns
+    return [lemma for pos, lemma in zip(*tags) if pos == 'NN' or pos == 'NNS']
 
-def noun_overlap(t_xml, h_xml, replacements):
+def noun_overlap(t_tags, h_tags, replacements):
     """
     Calculate the amount of overlap between all nouns in t and h
     """
     score = 0
-    if t_xml == None or h_xml == None:
+    if t_tags == None or h_tags == None:
         return 0
-    t_set = set(get_nouns(t_xml.getroot()))
-    h_set = set(get_nouns(h_xml.getroot()))
+    t_set = set(get_nouns(t_tags))
+    h_set = set(get_nouns(h_tags))
     if float(len(t_set | h_set)) > 0:
         score = len(t_set & h_set) / float(len(t_set | h_set))
     
     for replacement in replacements:
-        if replacement[9] != None and replacement[10] != None:
-            t_set = set(get_nouns(replacement[9].getroot()))
-            h_set = set(get_nouns(replacement[10].getroot()))
+        if replacement.t_tags != None and replacement.h_tags != None:
+            t_set = set(get_nouns(replacement.t_tags))
+            h_set = set(get_nouns(replacement.h_tags))
             if float(len(t_set | h_set)) > 0:
                 new_score = len(t_set & h_set) / float(len(t_set | h_set))
                 if new_score > score:
                     score = new_score
     return score
     
-def get_verbs(root):
+def get_verbs(tags):
     """
-    Return the list of verbs as found in the boxer xml 'root'
+    Return the list of verbs in the boxer tags (pos tags, lemmas) of a sentence
     """
-    verbs = []
-    for child in root.findall("./xdrs/taggedtokens/tagtoken/tags"):
-        noun = False
-        for grandchildren in child.findall("./tag[@type='pos']"):
-            if grandchildren.text == 'VBP' or grandchildren.text == 'VBG':
-                noun = True
-        if noun == True:
-            for grandchildren in child.findall("./tag[@type='lemma']"):
-                verbs.append(grandchildren.text)
-    return verbs
+    return [lemma for pos, lemma in zip(*tags) if pos == 'VBP' or pos == 'VBG']
 
-def verb_overlap(t_xml, h_xml, replacements):
+def verb_overlap(t_tags, h_tags, replacements):
     """
     Calculate the amount of overlap between all verbs in t and h
     """
     score = 0
-    if t_xml == None or h_xml == None:
+    if t_tags == None or h_tags == None:
         return 0
-    t_set = set(get_verbs(t_xml.getroot()))
-    h_set = set(get_verbs(h_xml.getroot()))
+    t_set = set(get_verbs(t_tags))
+    h_set = set(get_verbs(h_tags))
     if float(len(t_set | h_set)) > 0:
         score = len(t_set & h_set) / float(len(t_set | h_set))
     
     for replacement in replacements:
-        if replacement[9] != None and replacement[10] != None:
-            t_set = set(get_verbs(replacement[9].getroot()))
-            h_set = set(get_verbs(replacement[10].getroot()))
+        if replacement.t_tags != None and replacement.h_tags != None:
+            t_set = set(get_verbs(replacement.t_tags))
+            h_set = set(get_verbs(replacement.h_tags))
             if float(len(t_set | h_set)) > 0:
                 new_score = len(t_set & h_set) / float(len(t_set | h_set))
                 if new_score > score:
@@ -309,22 +340,19 @@ def verb_overlap(t_xml, h_xml, replacements):
     
     return score
 
+def get_role(drs, role):
+    """
+    Return the pred symbols of the variables filling role (e.g. agent) in a parsed drs
+    """
+    return [symbol for relation, _, variable in drs.rels if relation == role
+            for symbol in drs.symbols.get(variable, ())]
+
 def get_agent(drs):
     """
     Return all agents in the drs data as a list
     """
-    agents = []
-    for line in drs:
-        if line.strip().startswith('sem'):
-            datalist = line.split(':')
-            for word in datalist:
-                if word.count('agent') > 0:
-                    variable = word[6:7]
-                    for word in datalist:
-                        if word.startswith('pred({0}'.format(variable)):
-                            agents.append(word.split(',')[1])
-    return agents
-                        
+    return get_role(drs, 'agent')
+
 def agent_overlap(t_drs, h_drs, replacements):
     """
     Calculates the overlap between the agents in 2 drs's
@@ -341,24 +369,17 @@ def agent_overlap(t_drs, h_drs, replacements):
     
     else:
         for replacement in replacements:
-            if get_agent(replacement[15]) == get_agent(replacement[16]):
+            if get_agent(replacement.t_drs) == get_agent(replacement.h_drs):
                 return 1
     return 0
 
 def get_patient(drs):
     """
-    Returns the patient in a drs as a list
+    Returns the patient in a drs (the first one, or None)
     """
-    for line in drs:
-        if line.strip().startswith('sem'):
-            datalist = line.split(':')
-            for word in datalist:  
-                if word.count('patient') > 0:
-                    variable = word[6:7]
-                    for word in datalist:
-                        if word.startswith('pred({0}'.format(variable)):
-                            return word.split(',')[1]
-                            
+    patients = get_role(drs, 'patient')
+    if patients:
+        return patients[0]
 
 def patient_overlap(t_drs, h_drs, replacements):
     """
@@ -368,24 +389,15 @@ def patient_overlap(t_drs, h_drs, replacements):
         return 1
     else:
         for replacement in replacements:
-            if get_patient(replacement[15]) == get_patient(replacement[16]):
+            if get_patient(replacement.t_drs) == get_patient(replacement.h_drs):
                 return 1
     return 0
 
-def get_pred(drs_file):
+def get_pred(drs):
     """
     Returns a list of all rel and pred words in a drs
     """
-    pred = []
-    for line in drs_file:
-        if line.strip().startswith('sem'):
-            datalist = line.split(':')
-            for statement in datalist:
-                if statement.startswith('rel('):
-                    pred.append(statement.split(',')[2])
-                if statement.startswith('pred('):
-                    pred.append(statement.split(',')[1])
-    return pred
+    return [relation for relation, _, _ in drs.rels] + [symbol for _, symbol in drs.preds]
 
 def pred_overlap(t, h):
     """
@@ -396,43 +408,43 @@ def pred_overlap(t, h):
     return len(a_set&b_set)/float(len(a_set|b_set))
 
 
-def get_drs(drs_file):
-    pred = []
-    rel = []
-    for line in drs_file:
-        if line.strip().startswith('sem'):
-            datalist = line.split(':')
-            for statement in datalist:
-                if statement.startswith('rel('):
-                    statement_list = statement.split(',')
-                    rel.append([statement_list[2], statement_list[0][-1:], statement_list[1]])
-                if statement.startswith('pred('):
-                    statement_list = statement.split(',')
-                    pred.append([statement_list[1], statement_list[0][-1:]])
-    # results in:     
-    # pred = [['kid', 'B'], ['smile', 'C'], ['man', 'D'], ['play', 'E'], ['outdoors', 'F']]
-    # rel = [['near', 'E', 'D'], ['with', 'D', 'C'], ['patient', 'E', 'F'], ['agent', 'E', 'B']]
-
-    list_all = []
-    for itr_rel in rel:
-        match1 = False
-        symbol1 = ''
-        symbol2 = ''
-        for itr_pred in pred:
-            if itr_rel[1] is itr_pred[1]:
-                match1 = True
-                symbol1 = itr_pred[0]
-        match2 = False
-        for itr_pred in pred:
-            if itr_rel[2] is itr_pred[1]:
-                match2 = True
-                symbol2 = itr_pred[0]
-        if match1 is False or match2 is False:
-            #TODO something more complicated is going on in the drs...
-            pass
-        else:
-            list_all.append('{0} {1} {2}'.format(itr_rel[0], symbol1, symbol2))
-    return list_all
+def get_triples(drs):
+    """
+    Returns all (relation, head, dependent) triples of a drs: each rel with every pred symbol
+    of its first variable (head) and of its second variable (dependent)
+    """
+    symbols = drs.symbols
+    return [(relation, head, dependent) for relation, variable_a, variable_b in drs.rels
+            for head in symbols.get(variable_a, ()) for dependent in symbols.get(variable_b, ())]
+
+def get_drs(drs):
+    """
+    Returns the triples of a drs as 'relation head dependent' strings
+    """
+    # results in e.g. ['near play man', 'with man smile', 'patient play outdoors', 'agent play kid']
+    return ['{0} {1} {2}'.format(*triple) for triple in get_triples(drs)]
+
+def get_triple_set(drs):
+    """
+    Returns the set of (relation, head, dependent) triples of a drs
+    """
+    return frozenset(get_triples(drs))
+
+def triple_overlap(t_drs, h_drs, replacements):
+    """
+    Calculate the overlap between the relation triples of the drs of t and h
+    """
+    score = 0
+    for t, h in [(t_drs, h_drs)] + [(replacement.t_drs, replacement.h_drs) for replacement in replacements]:
+        if t is None or h is None:
+            continue
+        t_set = get_triple_set(t)
+        h_set = get_triple_set(h)
+        if t_set or h_set:
+            new_score = len(t_set & h_set) / float(len(t_set | h_set))
+            if new_score > score:
+                score = new_score
+    return score
 
 def drs(t_drs, h_drs):
     t = set(get_pred(t_drs))
@@ -447,12 +459,15 @@ def tfidf(t, h):
     """
     h[0] = h[0].lower()
     t[0] = t[0].lower()
+    terms = term_statistics.get()
+    weights = terms.get_weights()
     score = 0
     for word in t:
         word = word.strip()
         if word in h:
-            if word in config.doc_freq:
-                score += (float(config.total_sentences) - config.word_freq[word]) / config.total_sentences
+            i = terms.index(word)
+            if i >= 0:
+                score += weights.item(i)
             else:
                 score += 1
     return score
@@ -536,6 +551,7 @@ return as a dict mapping to a list with the appropriate index set to 1.
 
 url = 'http://127.0.0.1:7777/raw/pipeline?format=xml'
 def sent_complexity(sentence):
+    import requests
     r = requests.post(url, data=' '.join(sentence))
     complexity = drs_complexity.parse_xml(r.text)
 
@@ -548,10 +564,68 @@ def drs_complexity_difference(sentence_a, sentence_b):
     return abs(sent_a_complexity-sent_b_complexity)
 
 
+############################################################
 
+def load_wordnet():
+    """
+    Load WordNet (nltk's corpus loader reads it on first attribute access).
+    """
+    from nltk.corpus import wordnet as wn
+    wn.synsets
+    return wn
+
+def load_synset_lemmas():
+    """
+    Load the synset lemma table, looking up the corpus words that are not in it yet.
+    """
+    source = load_semeval_data.wordnet_source()
+    table = synset_table.load_table(config.synset_table, source)
+    missing = [word for word in corpus.get().vocabulary if word not in table]
+    if missing:
+        if config.DEBUG: stdout.write('looking up the synsets of {0} words.. '.format(len(missing)))
+
+        table.add(missing, wordnet.get())
+        synset_table.save_table(config.synset_table, table, source)
 
-if config.RECALC_FEATURES:
-    # Load projection data
-    word_ids, projections = load_semeval_data.load_embeddings()
+        if config.DEBUG: stdout.write(' done!\n')
+    return table
+
+def load_synset_similarities():
+    """
+    Load the synset similarity matrix, adding the corpus words that are not in it yet.
+    """
+    source = load_semeval_data.wordnet_source()
+    index = synset_similarity.load_index(config.synset_similarity, source)
+    missing = [word for word in corpus.get().vocabulary if word not in index]
+    if missing:
+        if config.DEBUG: stdout.write('computing the synset similarities of {0} words.. '.format(len(missing)))
+
+        index.add(missing, wordnet.get())
+        synset_similarity.save_index(config.synset_similarity, index, source)
+
+        if config.DEBUG: stdout.write(' done!\n')
+    return index
+
+# Resources are loaded on first use, see warm_up
+embeddings = LazyResource(load_semeval_data.load_embeddings, load_semeval_data.embedding_source)
+phrase_index = LazyResource(load_phrase_index, load_semeval_data.embedding_source)   # Release it when replacing embeddings
+corpus = LazyResource(load_semeval_data.load_corpus_store)
+stop_ids = LazyResource(lambda: corpus.get().token_ids(config.stop_list))
+entailment_judgements = LazyResource(get_entailment_judgements)
+term_statistics = LazyResource(load_semeval_data.load_term_index)
+wordnet = LazyResource(load_wordnet, load_semeval_data.wordnet_source)
+synset_lemmas = LazyResource(load_synset_lemmas, load_semeval_data.wordnet_source)
+synset_similarities = LazyResource(load_synset_similarities, load_semeval_data.wordnet_source)
+
+def warm_up(resources=None):
+    """
+    Load resources (default: all of them) up front,
+    e.g. before timing or before starting worker processes.
+    """
+    if resources is None:
+        resources = [embeddings, phrase_index, corpus, stop_ids, entailment_judgements, term_statistics, wordnet, synset_lemmas, synset_similarities]
+    if embeddings in resources and phrase_index not in resources:
+        resources = list(resources) + [phrase_index]
+    for resource in resources:
+        resource.get()
 
-    entailment_judgements = get_entailment_judgements()
@@ -0,0 +1,62 @@
+#!/usr/bin/python
+
+"""
+Startup time report for SemEval Shared Task 1.
+
+Imports the given modules (default: the entry points) and prints how long
+the import of each module took, both including the modules it imported
+in turn (total) and by itself (self), slowest first.
+Modules that are only needed on some paths (plotting, sklearn, nltk, requests)
+are imported where they are used, and should not show up here.
+
+Running example:
+python src/import_report.py semeval_task1 reclassify_neutrals
+"""
+
+import sys
+import time
+import __builtin__
+
+def time_imports(names):
+    """
+    Import the modules in names, return a list of (module, total, self) times in seconds.
+    """
+    original_import = __builtin__.__import__
+    times = []
+    children = [0.0]    # Time spent in nested imports, one entry per level
+
+    def timed_import(name, *args, **kwargs):
+        loaded = name in sys.modules
+        children.append(0.0)
+        start = time.time()
+        try:
+            return original_import(name, *args, **kwargs)
+        finally:
+            total = time.time() - start
+            nested = children.pop()
+            children[-1] += total
+            if not loaded and name in sys.modules:
+                times.append((name, total, total-nested))
+
+    __builtin__.__import__ = timed_import
+    try:
+        for name in names:
+            __import__(name)
+    finally:
+        __builtin__.__import__ = original_import
+
+    return times
+
+def main(names):
+    start = time.time()
+    times = time_imports(names)
+    total = time.time() - start
+
+    print '{0:>10} {1:>10}  {2}'.format('total ms', 'self ms', 'module')
+    for name, module_total, module_self in sorted(times, key=lambda t: t[1], reverse=True):
+        if module_total >= 0.001:
+            print '{0:>10.1f} {1:>10.1f}  {2}'.format(module_total*1000, module_self*1000, name)
+    print 'imported {0} modules in {1:.3f}s'.format(len(times), total)
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or ['semeval_task1', 'reclassify_neutrals'])
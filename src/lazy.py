@@ -0,0 +1,52 @@
+#!/usr/bin/python
+
+"""
+Lazily loaded resources for SemEval Shared Task 1.
+
+Large resources (embeddings, Johan's judgements, term statistics)
+are wrapped in a LazyResource, so that importing a module is cheap
+and a process only loads what it actually uses.
+"""
+
+import threading
+
+class LazyResource(object):
+    """
+    Resource that is loaded by calling loader() on first use.
+    Loading happens only once, also when several threads ask for it at the same time.
+    source(), if given, returns a fingerprint of the data the resource is built from
+    (e.g. sizes and modification times of files), without loading it.
+    """
+    def __init__(self, loader, source=None):
+        self.loader = loader
+        self.source = source
+        self.lock = threading.Lock()
+        self.value = None
+        self.loaded = False
+
+    def get(self):
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self.value = self.loader()
+                    self.loaded = True
+        return self.value
+
+    def set(self, value):
+        """
+        Replace the resource, e.g. by one loaded with different settings.
+        """
+        with self.lock:
+            self.value = value
+            self.loaded = True
+
+    def release(self):
+        """
+        Drop the resource, it is loaded again on next use.
+        """
+        with self.lock:
+            self.value = None
+            self.loaded = False
+
+    def fingerprint(self):
+        return self.source() if self.source is not None else None
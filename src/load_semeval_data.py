@@ -8,36 +8,158 @@ __author__ = 'Johannes Bjerva'
 __email__  = 'j.bjerva@rug.nl'
 
 import os
-import shlex
 import cPickle
+import hashlib
 import sPickle
+import record_archive
+import corpus_store
+import term_index
 import numpy as np
-import requests
-import xml.etree.ElementTree as et
+
+try:
+    import xml.etree.cElementTree as et
+except ImportError:
+    import xml.etree.ElementTree as et
 
 from sys import stdout
-from collections import defaultdict
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import WordPunctTokenizer
-from nltk.tokenize.treebank import TreebankWordTokenizer
-from subprocess import check_output, call
+from StringIO import StringIO
+from collections import defaultdict, namedtuple
+from multiprocessing import Pool, cpu_count
 
 import drs_complexity
+import embedding_store
+import convert_embeddings
+import code_fingerprint
 import config
 
-# Tools for lemmatization/tokenization
-wnl = WordNetLemmatizer()
-wpt = WordPunctTokenizer()
-twt = TreebankWordTokenizer()
+from lazy import LazyResource
+
+def get_lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+# Lemmatizer, created on first use since nltk is slow to import
+wnl = LazyResource(get_lemmatizer)
 
 # Used to encode the entailment judgements numerically
 judgement_ids = defaultdict(lambda:len(judgement_ids))
 prediction_ids = defaultdict(lambda:len(prediction_ids))
 prover_ids = defaultdict(lambda:len(prover_ids))
 
-def load_embeddings():
+def load_embeddings(precision=None):
+    """
+    Load embeddings, restricted to the words and phrases in the sick data
+    if config.USE_EMBEDDING_SUBSET is set.
+    The subset store is built from the full store if it does not exist yet,
+    and extended if the sick data has lemmas or phrases it was not built for
+    (it is rebuilt if the full store changed). The sick data is only loaded
+    if it changed since the subset was checked against it (see get_sick_fingerprint).
+    Precision defaults to config.EMBEDDING_PRECISION.
+    """
+    precision = precision or config.EMBEDDING_PRECISION
+    if not config.USE_EMBEDDING_SUBSET:
+        return load_embedding_store(precision)
+
+    subset = config.embedding_subset.format(config.vector_num)
+    corpus = get_sick_fingerprint()
+    sick_data = None
+    saved_keys = set()
+    try:
+        if config.DEBUG: stdout.write('loading embedding subset {0}.. '.format(config.vector_num))
+
+        saved_keys, source, saved_corpus = embedding_store.read_subset_keys(subset)
+        store_source = get_store_source()
+        if store_source is not None and source != store_source:
+            saved_keys = set()
+            raise IOError('the full embedding store changed')
+        if saved_corpus != corpus:
+            sick_data = load_sick_data()
+            # Looked up by sentence_distance, the variants are only needed when the subset is built
+            if not get_embedding_keys(sick_data, variants=False) <= saved_keys:
+                raise IOError('the sick data has new lemmas')
+            embedding_store.write_subset_keys(subset, saved_keys, source, corpus)
+        word_ids, projections = embedding_store.open_store(subset, precision)
+
+    except IOError as e:
+        if config.DEBUG: stdout.write(' error ({0}) - building it from the full store..\n'.format(e))
+
+        sick_data = sick_data or load_sick_data()
+        keys = get_embedding_keys(sick_data) | saved_keys
+        word_ids, projections = load_embedding_store()
+        embedding_store.write_subset(subset, word_ids, projections, keys, get_store_source(), corpus)
+        del projections
+
+        word_ids, projections = embedding_store.open_store(subset, precision)
+
+    if config.DEBUG: stdout.write(' done!\n')
+
+    return word_ids, projections
+
+def get_store_source():
+    """
+    Sizes and modification times of the files of the full embedding store, None if there is none.
+    """
+    store = config.embedding_store.format(config.vector_num)
+    try:
+        return [(os.stat(path).st_size, os.stat(path).st_mtime) for path in
+                (os.path.join(store, embedding_store.MATRIX_FILE), os.path.join(store, embedding_store.VOCAB_FILE))]
+    except OSError:
+        return None
+
+def embedding_source():
+    """
+    Fingerprint of the embeddings load_embeddings returns: the full store they are taken from
+    (a subset has the same rows for all keys it was written for).
+    """
+    source = get_store_source()
+    if source is None and config.USE_EMBEDDING_SUBSET:
+        try:
+            _, source, _ = embedding_store.read_subset_keys(config.embedding_subset.format(config.vector_num))
+        except IOError:
+            pass
+    return config.vector_num, source
+
+def wordnet_source():
+    """
+    Sizes and modification times of the WordNet data files, None if WordNet is not installed.
+    """
+    import nltk.data
+    try:
+        pointer = nltk.data.find('corpora/wordnet')
+    except LookupError:
+        return None
+    path = getattr(pointer, 'path', None) or pointer.zipfile.filename     # Directory or zip file
+    if os.path.isdir(path):
+        paths = sorted(os.path.join(path, f_name) for f_name in os.listdir(path))
+    else:
+        paths = [path]
+    return [(os.path.basename(path), os.stat(path).st_size, os.stat(path).st_mtime) for path in paths]
+
+def get_embedding_keys(sick_data, variants=True):
+    """
+    Collect every lemma and lemma phrase (w1_w2, w1_w2_w3, ..)
+    that sentence_distance could look up, for all pairs and (if variants is set) paraphrases.
     """
-    Load embeddings either from pre-processed binary, or fallback to txt if non-existant
+    lengths = range(2, max(3, config.MAX_PHRASE_LENGTH)+1)
+    keys = set()
+    for pair in sick_data:
+        sentences = [pair.t_lemmas, pair.h_lemmas]
+        if variants:
+            for replacement in pair.variants:
+                sentences += [replacement.t_lemmas, replacement.h_lemmas]
+
+        for sentence in sentences:
+            keys.update(sentence)
+            for n in lengths:
+                keys.update('_'.join(sentence[i:i+n]) for i in xrange(len(sentence)-n+1))
+
+    return keys
+
+def load_embedding_store(precision='full'):
+    """
+    Load embeddings from the memory-mapped store.
+    If there is no store yet, it is built from the pre-processed binary,
+    or from the txt-file if that is non-existant.
     """
     num = config.vector_num
     if num == 1:
@@ -47,89 +169,193 @@ def load_embeddings():
     elif num == 3:
         vector_file = 'vectors_en.txt'
 
+    store = config.embedding_store.format(num)
     try:
-        if config.DEBUG: stdout.write('loading embedding {0} from archives.. '.format(num))
+        if config.DEBUG: stdout.write('loading embedding {0} from store.. '.format(num))
 
-        with open('google_news_ids{0}.pickle'.format(num), 'rb') as in_f:
-            word_ids = cPickle.load(in_f)     
-        with open('google_news_np{0}.pickle'.format(num), 'rb') as in_f:
-            projections = np.load(in_f)
+        word_ids, projections = embedding_store.open_store(store, precision)
 
     except IOError:
-        if config.DEBUG: stdout.write(' error - processing txt-file instead (~15 mins)..')  
+        try:
+            if config.DEBUG: stdout.write(' error - converting archives instead..')
+
+            with open('google_news_ids{0}.pickle'.format(num), 'rb') as in_f:
+                word_ids = cPickle.load(in_f)
+            with open('google_news_np{0}.pickle'.format(num), 'rb') as in_f:
+                projections = np.load(in_f)
+
+        except IOError:
+            if config.DEBUG: stdout.write(' error - processing txt-file instead..\n')
+
+            convert_embeddings.convert(config.working_path+vector_file, store)
+        else:
+            embedding_store.write_store(store, word_ids, projections)
+            del projections
+
+        word_ids, projections = embedding_store.open_store(store, precision)
 
-        projections, word_ids = load_word2vec(vector_file)
-        with open('google_news_ids{0}.pickle'.format(num), 'wb') as out_f:
-            cPickle.dump(dict(word_ids), out_f, -1)
-        with open('google_news_np{0}.pickle'.format(num), 'wb') as out_f:
-            np.save(out_f, projections)
-    
     if config.DEBUG: stdout.write(' done!\n')
 
     return word_ids, projections
 
-def load_word2vec(f_name):
+def load_term_index():
     """
-    Load word projections generated by word2vec from txt-rep.
-    This takes a  while.
+    Load the term statistics of the t.tok and h.tok files of all sick pairs (see term_index.py).
+    Only pairs whose files were added, changed or removed since the index was saved are (re-)counted.
     """
-    if config.DEBUG: stdout.write('\ngetting vocab size: ')
-    vocab_size = int(check_output(shlex.split('wc -l {0}'.format(config.working_path+f_name))).split()[0])
-    if config.DEBUG: stdout.write(str(vocab_size)+'\n')
-
-    word_ids = defaultdict(lambda:len(word_ids))
+    if config.DEBUG: stdout.write('loading term index.. ')
+
+    index = term_index.load_index(config.term_index)
+    ids = set(os.listdir(config.shared_sick))
+    changed = False
+    for id in set(index.pairs) - ids:
+        index.remove_pair(id)
+        changed = True
+
+    for id in ids:
+        folder = os.path.join(config.shared_sick, id)
+        fingerprint = get_fingerprint(folder, TOK_FILES)
+        if index.fingerprint(id) != fingerprint:
+            sentences = []
+            for f_name in TOK_FILES:
+                path = os.path.join(folder, f_name)
+                if os.path.isfile(path):
+                    sentences += [line.split() for line in open(path)]
+            index.add_pair(id, fingerprint, sentences)
+            changed = True
+
+    if changed:
+        term_index.save_index(config.term_index, index)
 
-    if config.DEBUG: print 'filling rep matrix'
-    with open(config.working_path+f_name, 'r') as in_f:
-        # First line is <s\>, i.e. unnecessary for our purposes
-        # Use to get dimensionality and throw away.
-        first = in_f.readline()
-        dimensions = len(first.split()[1:])
-
-        # NP matrix for word projections
-        word_projections = np.zeros( (vocab_size, dimensions), dtype=np.float64)
+    if config.DEBUG: stdout.write(' done!\n')
 
-        for line in in_f:
-            fields = line.split()
-            try:
-                word_id = word_ids[fields[0].lower()]
-                word_projections[word_id] = [float(i) for i in fields[1:]]
-            except ValueError:
-                # Error with embedding file - do nothing for now.
-                pass
+    return index
 
-    return word_projections, word_ids
+def get_sick_ids():
+    """
+    Return the ids of the sick pairs, in the order of SICK_all.txt.
+    """
+    return [line.split()[0] for line in open(os.path.join(config.working_path,'SICK_all.txt'))
+            if line.split()[0] != 'pair_ID']
 
+def get_sick_fingerprint():
+    """
+    Fingerprint of all sick pairs and their variants (see get_pair_fingerprint
+    and get_variant_fingerprint), taken without loading them.
+    """
+    md5 = hashlib.md5()
+    for id in get_sick_ids():
+        md5.update(repr((id, get_pair_fingerprint(os.path.join(config.shared_sick, id)), get_variant_fingerprint(id))))
+    return md5.hexdigest()
 
 def load_sick_data():
     """
-    Attempt to load sick data from binary,
-    otherwise fall back to txt.
+    Load sick data from the binary archive, re-reading only the pairs whose
+    source files changed since they were cached (see get_fingerprint), and the variants
+    of the pairs whose sick2 folders changed (see get_variant_fingerprint).
+    Falls back to the old sick.pickle stream, or to txt, for pairs that are not cached.
     """
-    try:
-        if config.DEBUG: stdout.write('loading sick from archives.. ')
+    if config.DEBUG: stdout.write('loading sick from archives.. ')
 
-        sick_data = []
-        for element in sPickle.s_load(open('sick.pickle')):
-            sick_data.append(element)
-
-    except IOError:
-        if config.DEBUG: stdout.write(' error - loading from txt-files..')
-        
-        sick_data = []
-        for line in open(os.path.join(config.working_path,'SICK_all.txt')):
-            if line.split()[0] != 'pair_ID':
-                sick_data.append(load_sick_data_from_folder(line.split()[0]))
-
-        # Sort according to SICK_all.txt
-        with open('sick.pickle', 'wb') as out_f:
-            sPickle.s_dump(sick_data, out_f)
+    ids = get_sick_ids()
+    try:
+        archive = record_archive.RecordArchive(config.sick_archive)
+        cached = dict((id, archive.get(id)) for id in ids)
+        archived = len(archive)
+
+    except (IOError, EOFError, cPickle.UnpicklingError, ValueError):
+        # Missing, or damaged (e.g. written by an older version that was interrupted)
+        try:
+            if config.DEBUG: stdout.write(' error - converting sick.pickle..')
+
+            with open('sick.pickle') as in_f:
+                cached = dict((str(id_data[0]), PairRecord.from_list(id_data, os.path.join(config.shared_sick, str(id_data[0]))))
+                              for id_data in sPickle.s_load(in_f))
+
+        except IOError:
+            cached = {}
+        archived = 0
+
+    stale = [id for id in ids if cached.get(id) is None or
+             cached[id].fingerprint != get_pair_fingerprint(os.path.join(config.shared_sick, id))]
+    reread = set(stale)
+    stale_variants = [id for id in ids if id not in reread and
+                      cached[id].variant_fingerprint != get_variant_fingerprint(id)]
+    if stale or stale_variants:
+        if config.DEBUG: stdout.write(' re-loading {0} pairs and the variants of {1} pairs from txt-files..'.format(len(stale), len(stale_variants)))
+
+        get_variant_index()   # Built once, before the workers start
+        get_lemma_cache()
+        reloaded = list(load_sick_data_from_folders(stale))
+        for id_data in reloaded:
+            cached[id_data.id] = id_data
+        reloaded_variants = list(load_sick_data_from_folders(stale_variants, load=load_variants))
+        for id, (fingerprint, variants) in zip(stale_variants, reloaded_variants):
+            cached[id].variant_fingerprint = fingerprint
+            cached[id].variants = variants
+            reloaded.append(cached[id])
+        update_lemma_cache(reloaded)
+        save_lemma_cache()
+
+    # Sorted according to SICK_all.txt
+    sick_data = [cached[id] for id in ids]
+    if stale or stale_variants or archived != len(ids):
+        record_archive.write_archive(config.sick_archive, sick_data)
     
     if config.DEBUG:
         stdout.write(' done!\n')
 
     return sick_data
 
+def load_corpus_store(sick_data=None):
+    """
+    Open the columnar corpus store (see corpus_store.py).
+    It is (re-)built from the sick data if it is missing, or if any pair or variant
+    or the code writing the store changed since it was built.
+    """
+    if config.DEBUG: stdout.write('loading corpus store.. ')
+
+    def get_source():
+        return [get_sick_fingerprint(), code_fingerprint.fingerprint([corpus_store.write_store])]
+
+    try:
+        if corpus_store.read_source(config.corpus_store) != get_source():
+            raise IOError('corpus store is out of date')
+    except (IOError, OSError):
+        if config.DEBUG: stdout.write(' error - building it from the sick data..\n')
+
+        sick_data = sick_data or load_sick_data()
+        corpus_store.write_store(config.corpus_store, sick_data, get_source())
+
+    if config.DEBUG: stdout.write(' done!\n')
+
+    return corpus_store.CorpusStore(config.corpus_store)
+
+def load_sick_data_from_folders(ids, workers=None, load=None):
+    """
+    Load the data of the given pair ids (by default their records, see load_sick_data_from_folder),
+    using a pool of worker processes.
+    The ids are handed out in chunks, and the results are yielded in the order of ids.
+    """
+    load = load or load_sick_data_from_folder
+    workers = workers or config.NUM_WORKERS or cpu_count()
+    if workers == 1 or not ids:
+        for id in ids:
+            yield load(id)
+        return
+
+    pool = Pool(workers)
+    try:
+        chunk_size = max(1, len(ids) // (workers*16))
+        for i, id_data in enumerate(pool.imap(load, ids, chunk_size)):
+            if config.DEBUG and (i+1) % 1000 == 0: stdout.write(' {0}'.format(i+1))
+            yield id_data
+        pool.close()
+        pool.join()
+    finally:
+        # No workers are left behind if one of them raised, or if the caller stopped early
+        pool.terminate()
+
 def read_txt_file(path, delimeter):
     """
     Convert a txt file to a list using a delimeter
@@ -147,85 +373,381 @@ def read_gold(path, delimeter):
     else:
         return None
     
-def read_xml_file(path):
+# Path of the tags of a token, below the root of a boxer xml file
+TAGS_PATH = ['xdrs', 'taggedtokens', 'tagtoken', 'tags']
+
+def read_tagged_tokens(source):
     """
-    Read and parse an xml file
+    Read the pos and lemma tags of the tokens in a boxer xml file (a path or file object).
+    The file is parsed incrementally, and each element is discarded once read.
+    Returns a tuple (pos tags, lemmas), or None if the file does not exist.
     """
-    if os.path.isfile(path):
-        return et.parse(path)
-    else:
-        # the file at path does not exist
+    if isinstance(source, basestring) and not os.path.isfile(source):
         return None
 
-def load_sick2_data_from_folder(id_folder):
+    pos_tags = []
+    lemmas = []
+    path = []
+    for event, elem in et.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            path.append(elem.tag)
+            if path[1:] == TAGS_PATH:
+                pos = lemma = None
+            continue
+
+        if path[1:-1] == TAGS_PATH and elem.tag == 'tag':
+            if elem.get('type') == 'pos':
+                pos = elem.text
+            elif elem.get('type') == 'lemma':
+                lemma = elem.text
+        elif path[1:] == TAGS_PATH:
+            pos_tags.append(pos)
+            lemmas.append(lemma)
+        path.pop()
+        elem.clear()
+
+    return tuple(pos_tags), tuple(lemmas)
+
+# Conditions of a boxer drs: preds are (variable, symbol) pairs, e.g. ('A', 'man') for pred(A,man,n,1),
+# rels are (relation, variable, variable) triples, e.g. ('agent', 'A', 'B') for rel(A,B,agent,0),
+# and symbols maps each variable to the symbols of its preds, in order
+DRS = namedtuple('DRS', 'preds rels symbols')
+
+def parse_drs(lines):
     """
-    Load the data from the sick2 folder
+    Parse the pred and rel conditions of the sem lines of a drs (a list of lines) into a DRS.
     """
-    id_data = []
-    id_data.append(id)                                                               #data[0]
-    id_data.append(None)                                                             #data[1] gold.sim is not available/needed here
-    id_data.append(read_txt_file(os.path.join(id_folder,'t'), ' '))                  #data[2]
-    id_data.append(read_txt_file(os.path.join(id_folder,'h'), ' '))                  #data[3]
-    id_data.append(read_txt_file(os.path.join(id_folder,'t.tok'), ' '))              #data[4]
-    id_data.append(read_txt_file(os.path.join(id_folder,'h.tok'), ' '))              #data[5]
-    id_data.append(read_txt_file(os.path.join(id_folder,'kt.mod'), '\n'))            #data[6]
-    id_data.append(read_txt_file(os.path.join(id_folder,'kh.mod'), '\n'))            #data[7]
-    id_data.append(read_txt_file(os.path.join(id_folder,'kth.mod'), '\n'))           #data[8]
-    id_data.append(read_xml_file(os.path.join(id_folder,'t.drs.xml')))                   #data[9]
-    id_data.append(read_xml_file(os.path.join(id_folder,'h.drs.xml')))                   #data[10]
-    id_data.append(read_txt_file(os.path.join(id_folder,'modsizedif.txt'), '\n'))    #data[11]
-    id_data.append(read_txt_file(os.path.join(id_folder,'prediction.txt'), '\n'))    #data[12]
-    id_data.append(get_lemmas(id_data[2]))                                           #data[13] 
-    id_data.append(get_lemmas(id_data[3]))                                           #data[14]
-    id_data.append(read_txt_file(os.path.join(id_folder,'t.drs'), '\n'))             #data[15]
-    id_data.append(read_txt_file(os.path.join(id_folder,'h.drs'), '\n'))             #data[16]
-    id_data.append([])                                                               #data[17] these are already replacements
-
-    return id_data
+    preds = []
+    rels = []
+    symbols = defaultdict(list)
+    for line in lines:
+        if line.strip().startswith('sem'):
+            for statement in line.split(':'):
+                if statement.startswith('rel('):
+                    statement_list = statement.split(',')
+                    rels.append((statement_list[2], statement_list[0][4:], statement_list[1]))
+                elif statement.startswith('pred('):
+                    statement_list = statement.split(',')
+                    preds.append((statement_list[0][5:], statement_list[1]))
+                    symbols[statement_list[0][5:]].append(statement_list[1])
+    return DRS(tuple(preds), tuple(rels), dict((variable, tuple(names)) for variable, names in symbols.iteritems()))
+
+def read_drs(path):
+    """
+    Read and parse a drs file, or return None if it does not exist.
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path) as in_f:
+        return parse_drs(in_f.read().split('\n'))
 
-def get_sick2_data(id):
+# Files read when a pair record is created, a change in any of them makes the cached record stale
+SOURCE_FILES = ('gold.sim', 't', 'h', 't.tok', 'h.tok', 't.drs', 'h.drs', 't.drs.xml', 'h.drs.xml', 'modsizedif.txt', 'prediction.txt')
+# Files read by the lazy fields (and so by features), not covered by the pair fingerprint
+LAZY_SOURCE_FILES = ('kt.mod', 'kh.mod', 'kth.mod')
+# Files counted in the term index
+TOK_FILES = ('t.tok', 'h.tok')
+
+def get_fingerprint(folder, f_names=SOURCE_FILES):
+    """
+    Fingerprint of (by default) the source files of a pair folder, depending on config.CACHE_FINGERPRINT
+    either their sizes and modification times, or an md5 hash of their contents.
+    """
+    if config.CACHE_FINGERPRINT == 'content':
+        md5 = hashlib.md5()
+        for f_name in f_names:
+            path = os.path.join(folder, f_name)
+            if os.path.isfile(path):
+                md5.update(f_name+'\0')
+                md5.update(open(path, 'rb').read())
+        return md5.hexdigest()
+
+    fingerprint = []
+    for f_name in f_names:
+        try:
+            stat = os.stat(os.path.join(folder, f_name))
+            fingerprint.append((stat.st_size, stat.st_mtime))
+        except OSError:
+            fingerprint.append(None)
+    return tuple(fingerprint)
+
+loader_code = None
+
+def loader_fingerprint():
+    """
+    Fingerprint of the code reading a pair (see code_fingerprint.py),
+    and of the WordNet data its lemmas come from.
+    """
+    global loader_code
+    if loader_code is None:
+        loader_code = hashlib.md5(repr((code_fingerprint.fingerprint([PairRecord, load_sick_data]),
+                                        wordnet_source()))).hexdigest()
+    return loader_code
+
+def get_pair_fingerprint(folder):
+    """
+    Fingerprint of the source files of a pair folder and of the code reading them,
+    so that cached records are also re-read when that code changes.
+    """
+    return loader_fingerprint(), get_fingerprint(folder)
+
+def get_variant_fingerprint(id):
+    """
+    Fingerprints of the files of the sick2 folders of the variants of pair id.
+    """
+    return [(folder, get_fingerprint(os.path.join(config.shared_sick2, folder), SOURCE_FILES+LAZY_SOURCE_FILES))
+            for folder in get_variant_index().get(str(id), [])]
+
+# Fields of a pair, in the order of the old 18-element lists
+FIELDS = ('id', 'gold', 't', 'h', 't_tok', 'h_tok', 'kt_mod', 'kh_mod', 'kth_mod',
+          't_tags', 'h_tags', 'modsizedif', 'prediction', 't_lemmas', 'h_lemmas',
+          't_drs', 'h_drs', 'variants')
+
+# Expensive fields, read from the pair folder on first access
+LAZY_FIELDS = {
+    'kt_mod':   lambda pair: read_txt_file(os.path.join(pair.folder,'kt.mod'), '\n'),
+    'kh_mod':   lambda pair: read_txt_file(os.path.join(pair.folder,'kh.mod'), '\n'),
+    'kth_mod':  lambda pair: read_txt_file(os.path.join(pair.folder,'kth.mod'), '\n'),
+}
+
+NOT_LOADED = object()
+
+class PairRecord(object):
+    """
+    Data of a sick pair, or of one of its paraphrase variants (sick2).
+    Texts, tokens, lemmas, boxer tags, parsed drs, Johan's outputs and the variants
+    are read when the record is created, and cached with it.
+    Models are read on first access, and dropped again by release().
+    The fingerprints of the source files and of the variant folders tell load_sick_data
+    whether a cached record or its variants are stale.
+    The old list indices still work, e.g. pair[13] is pair.t_lemmas.
+    """
+    __slots__ = ('folder', 'fingerprint', 'variant_fingerprint', 'is_variant', 'id', 'gold', 't', 'h', 't_tok', 'h_tok',
+                 't_tags', 'h_tags', 'modsizedif', 'prediction', 't_lemmas', 'h_lemmas', 't_drs', 'h_drs',
+                 'variants') + tuple('_'+name for name in sorted(LAZY_FIELDS))
+
+    def __init__(self, folder, id, is_variant=False):
+        self.folder = folder
+        # Taken before reading, so a change during loading is picked up next time
+        self.fingerprint = None if is_variant else get_pair_fingerprint(folder)
+        self.variant_fingerprint = None if is_variant else get_variant_fingerprint(id)
+        self.is_variant = is_variant
+        self.id = id
+        # gold.sim is not available/needed for variants
+        self.gold = None if is_variant else read_gold(os.path.join(folder,'gold.sim'), '\n')
+        self.t = read_txt_file(os.path.join(folder,'t'), ' ')
+        self.h = read_txt_file(os.path.join(folder,'h'), ' ')
+        self.t_tok = read_txt_file(os.path.join(folder,'t.tok'), ' ')
+        self.h_tok = read_txt_file(os.path.join(folder,'h.tok'), ' ')
+        self.t_tags = read_tagged_tokens(os.path.join(folder,'t.drs.xml'))
+        self.h_tags = read_tagged_tokens(os.path.join(folder,'h.drs.xml'))
+        self.t_drs = read_drs(os.path.join(folder,'t.drs'))
+        self.h_drs = read_drs(os.path.join(folder,'h.drs'))
+        self.modsizedif = read_txt_file(os.path.join(folder,'modsizedif.txt'), '\n')
+        self.prediction = read_txt_file(os.path.join(folder,'prediction.txt'), '\n')
+        self.t_lemmas = get_lemmas(self.t)
+        self.h_lemmas = get_lemmas(self.h)
+        # variants are already replacements
+        self.variants = [] if is_variant else get_sick2_data(id)
+        self.unload()
+
+    @classmethod
+    def from_list(cls, id_data, folder, is_variant=False):
+        """
+        Convert an old 18-element list, with all its fields already loaded.
+        """
+        pair = cls.__new__(cls)
+        pair.folder = folder
+        pair.fingerprint = None if is_variant else get_pair_fingerprint(folder)
+        pair.variant_fingerprint = None     # Not known, the variants are read again
+        pair.is_variant = is_variant
+        for name, value in zip(FIELDS, id_data):
+            if name == 'variants':
+                value = [cls.from_list(variant, None, True) for variant in value]
+            elif name in ('t_tags', 'h_tags') and value is not None:
+                value = read_tagged_tokens(StringIO(et.tostring(value.getroot())))
+            elif name in ('t_drs', 'h_drs') and value is not None:
+                value = parse_drs(value)
+            setattr(pair, name, value)
+        return pair
+
+    def unload(self):
+        for name in LAZY_FIELDS:
+            setattr(self, '_'+name, NOT_LOADED)
+
+    def release(self):
+        """
+        Drop the lazily loaded fields of the record and its variants (if they can be read again).
+        """
+        for variant in self.variants:
+            variant.release()
+        if self.folder is not None:
+            self.unload()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [getattr(self, name) for name in FIELDS[i]]
+        return getattr(self, FIELDS[i])
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __getstate__(self):
+        # Lazy fields are only kept if they cannot be read again
+        return dict((name, getattr(self, name)) for name in self.__slots__
+                    if self.folder is None or not name.startswith('_'))
+
+    def __setstate__(self, state):
+        self.unload()
+        for name, value in state.iteritems():
+            if name in self.__slots__:
+                setattr(self, name, value)
+        # Records cached by an older version may have dropped fields (ignored above),
+        # or lack some fields, and are re-read
+        if not all(hasattr(self, name) for name in self.__slots__):
+            self.fingerprint = None
+
+def lazy_field(name):
     """
-    Look for all the alternative sick folder (using paraphrases) and get the candc data from these folders
+    Property reading a lazy field on first access.
     """
-    sick2_data = []
+    slot = '_'+name
+    def get(pair):
+        value = getattr(pair, slot)
+        if value is NOT_LOADED:
+            value = LAZY_FIELDS[name](pair)
+            setattr(pair, slot, value)
+        return value
+    def set(pair, value):
+        setattr(pair, slot, value)
+    return property(get, set)
+
+for name in LAZY_FIELDS:
+    setattr(PairRecord, name, lazy_field(name))
+
+variant_index = None
+
+def get_variant_index():
+    """
+    Return a dict mapping each pair id to its sick2 folders, ordered by variant number.
+    The index is kept in config.sick2_manifest, and only rebuilt (with one
+    directory listing) when the modification time of the sick2 directory changes.
+    """
+    global variant_index
+    if variant_index is not None:
+        return variant_index
+
+    mtime = os.stat(config.shared_sick2).st_mtime
+    try:
+        with open(config.sick2_manifest, 'rb') as in_f:
+            manifest = cPickle.load(in_f)
+        if manifest['mtime'] == mtime:
+            variant_index = manifest['variants']
+            return variant_index
+    except (IOError, EOFError, cPickle.UnpicklingError):
+        pass
+
+    variants = defaultdict(list)
     for folder in os.listdir(config.shared_sick2):
-        if str(folder).startswith("{0}.".format(id)):
-            sick2_data.append(load_sick2_data_from_folder(os.path.join(config.shared_sick2, folder)))
-    return sick2_data
+        id, _, num = folder.partition('.')
+        if num.isdigit():
+            variants[id].append((int(num), folder))
+    variant_index = dict((id, [folder for _, folder in sorted(folders)])
+                         for id, folders in variants.iteritems())
+
+    with open(config.sick2_manifest, 'wb') as out_f:
+        cPickle.dump({'mtime':mtime, 'variants':variant_index}, out_f, -1)
+    return variant_index
+
+def get_sick2_data(id):
+    """
+    Get the candc data from all the alternative sick folders (using paraphrases) of a pair
+    """
+    return [load_sick2_data_from_folder(os.path.join(config.shared_sick2, folder))
+            for folder in get_variant_index().get(str(id), [])]
+
+def load_variants(id):
+    """
+    Return the variant fingerprint and the variants of a pair, read again from its sick2 folders.
+    """
+    fingerprint = get_variant_fingerprint(id)
+    return fingerprint, get_sick2_data(id)
+
+# Lemma of each token (as it appears in the sentence), see get_lemma_cache
+lemma_cache = None
+saved_lemmas = 0
+
+def get_lemma_cache():
+    """
+    Return the token->lemma cache, loaded from config.lemma_cache on first use.
+    A cache saved with other WordNet data (see wordnet_source) is started again.
+    """
+    global lemma_cache, saved_lemmas
+    if lemma_cache is None:
+        lemma_cache = {}
+        try:
+            with open(config.lemma_cache, 'rb') as in_f:
+                saved = cPickle.load(in_f)
+            if isinstance(saved, tuple) and saved[0] == wordnet_source():
+                lemma_cache = saved[1]
+        except (IOError, EOFError, cPickle.UnpicklingError):
+            pass
+        saved_lemmas = len(lemma_cache)
+    return lemma_cache
+
+def update_lemma_cache(sick_data):
+    """
+    Add the lemmas of pairs and their variants loaded elsewhere (e.g. by worker processes) to the cache.
+    """
+    cache = get_lemma_cache()
+    for pair in sick_data:
+        for record in [pair] + list(pair.variants):
+            for sentence, lemmas in ((record.t, record.t_lemmas), (record.h, record.h_lemmas)):
+                if sentence is not None:
+                    cache.update(zip(sentence, lemmas))
+
+def save_lemma_cache():
+    """
+    Write the cache to config.lemma_cache, if tokens were added since it was loaded.
+    """
+    global saved_lemmas
+    cache = get_lemma_cache()
+    if len(cache) > saved_lemmas:
+        with open(config.lemma_cache+'.tmp', 'wb') as out_f:
+            cPickle.dump((wordnet_source(), cache), out_f, -1)
+        os.rename(config.lemma_cache+'.tmp', config.lemma_cache)
+        saved_lemmas = len(cache)
 
 def get_lemmas(sentence):
-    return [wnl.lemmatize(word.lower().strip()) for word in sentence]
+    """
+    Lemmatize the (lowercased, stripped) words of a sentence.
+    Each distinct token only goes through the WordNet lemmatizer once.
+    """
+    cache = get_lemma_cache()
+    lemmas = []
+    for word in sentence:
+        lemma = cache.get(word)
+        if lemma is None:
+            lemma = cache[word] = wnl.get().lemmatize(word.lower().strip())
+        lemmas.append(lemma)
+    return lemmas
 
 def load_sick_data_from_folder(id):
     """
     Load the data from the sick folder
     """
-    id_folder = os.path.join(config.shared_sick,str(id))
-    id_data = []
-    id_data.append(id)                                                               #data[0]
-    id_data.append(read_gold(os.path.join(id_folder,'gold.sim'), '\n'))              #data[1]
-    id_data.append(read_txt_file(os.path.join(id_folder,'t'), ' '))                  #data[2]
-    id_data.append(read_txt_file(os.path.join(id_folder,'h'), ' '))                  #data[3]
-    id_data.append(read_txt_file(os.path.join(id_folder,'t.tok'), ' '))              #data[4]
-    id_data.append(read_txt_file(os.path.join(id_folder,'h.tok'), ' '))              #data[5]
-    id_data.append(read_txt_file(os.path.join(id_folder,'kt.mod'), '\n'))            #data[6]
-    id_data.append(read_txt_file(os.path.join(id_folder,'kh.mod'), '\n'))            #data[7]
-    id_data.append(read_txt_file(os.path.join(id_folder,'kth.mod'), '\n'))           #data[8]
-    id_data.append(read_xml_file(os.path.join(id_folder,'t.drs.xml')))                   #data[9]
-    id_data.append(read_xml_file(os.path.join(id_folder,'h.drs.xml')))                   #data[10]
-    id_data.append(read_txt_file(os.path.join(id_folder,'modsizedif.txt'), '\n'))    #data[11]
-    id_data.append(read_txt_file(os.path.join(id_folder,'prediction.txt'), '\n'))    #data[12]
-    id_data.append(get_lemmas(id_data[2]))                                           #data[13]
-    id_data.append(get_lemmas(id_data[3]))                                           #data[14]
-    id_data.append(read_txt_file(os.path.join(id_folder,'t.drs'),'\n'))              #data[15]
-    id_data.append(read_txt_file(os.path.join(id_folder,'h.drs'),'\n'))              #data[16]
-    id_data.append(get_sick2_data(id))                                               #data[17]
-
-    return id_data
+    return PairRecord(os.path.join(config.shared_sick, str(id)), id)
+
+def load_sick2_data_from_folder(id_folder):
+    """
+    Load the data from the sick2 folder
+    """
+    return PairRecord(id_folder, os.path.basename(id_folder), True)
 
 
 url = 'http://127.0.0.1:7777/raw/pipeline?format=xml'
 def get_and_write_complexities(pair_id, sentence_a, sentence_b):
+    import requests
     root = './working/sick/'+pair_id
 
     r = requests.post(url, data=' '.join(sentence_a))
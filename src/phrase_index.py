@@ -0,0 +1,137 @@
+#!/usr/bin/python
+
+"""
+Phrase index for the embedding vocabulary.
+
+The skipgram models contain phrases, represented as word1_word2(_..._wordn).
+Instead of building and looking up the string of every candidate n-gram,
+the phrases are put in a trie over token ids, so all phrases in a sentence
+are found by walking the trie from each position, and their rows are
+returned directly.
+
+The trie is built once per vocabulary and saved as arrays in a phrases/ folder
+next to the vocabulary files, which are memory-mapped like the vocabulary itself,
+so processes using it do not build or hold it in memory:
+* a Vocabulary of the words in phrases, whose rows are the token ids
+* the sorted edge keys (node*tokens + token) and the child node of each edge
+* the row of the phrase ending at each node, or -1
+It is built again when the vocabulary files are rewritten.
+"""
+
+import os
+import numpy as np
+
+from vocabulary import Vocabulary, write_vocabulary, TABLE_FILE
+
+PHRASE_DIR = 'phrases'
+EDGES_FILE = 'edges.npy'
+CHILDREN_FILE = 'children.npy'
+NODE_ROWS_FILE = 'node_rows.npy'
+SOURCE_FILE = 'source.npy'
+
+def vocabulary_source(path):
+    """
+    Size and mtime of the hash table of the vocabulary at path (it is written last).
+    """
+    stat = os.stat(os.path.join(path, TABLE_FILE))
+    return np.array([stat.st_size, stat.st_mtime], dtype=np.float64)
+
+def write_phrase_index(path, vocabulary):
+    """
+    Write the trie of all phrases in vocabulary to path.
+    The source file is written last and marks the index as complete.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    if os.path.isfile(os.path.join(path, SOURCE_FILE)):
+        os.remove(os.path.join(path, SOURCE_FILE))
+
+    tokens = {}         # word -> token id
+    children = {}       # (node, token id) -> node, the root is node 0
+    node_rows = [-1]    # node -> row of the phrase ending there, or -1
+    row = vocabulary.rows.item
+    for i, entry in enumerate(vocabulary):
+        if '_' not in entry:
+            continue
+        node = 0
+        for word in entry.split('_'):
+            token = tokens.setdefault(word, len(tokens))
+            child = children.get((node, token))
+            if child is None:
+                child = len(node_rows)
+                children[node, token] = child
+                node_rows.append(-1)
+            node = child
+        node_rows[node] = row(i)
+
+    words = [None] * len(tokens)
+    for word, token in tokens.iteritems():
+        words[token] = word
+    write_vocabulary(path, words)
+
+    keys = np.array([node*len(tokens) + token for node, token in children], dtype=np.int64)
+    nodes = np.array(children.values(), dtype=np.int64)
+    order = np.argsort(keys)
+    np.save(os.path.join(path, EDGES_FILE), keys[order])
+    np.save(os.path.join(path, CHILDREN_FILE), nodes[order])
+    np.save(os.path.join(path, NODE_ROWS_FILE), np.array(node_rows, dtype=np.int64))
+
+    with open(os.path.join(path, SOURCE_FILE+'.tmp'), 'wb') as out_f:
+        np.save(out_f, vocabulary_source(vocabulary.path))
+    os.rename(os.path.join(path, SOURCE_FILE+'.tmp'), os.path.join(path, SOURCE_FILE))
+
+def has_phrase_index(path, vocabulary):
+    """
+    Whether path holds a complete phrase index of the current vocabulary files.
+    """
+    try:
+        source = np.load(os.path.join(path, SOURCE_FILE))
+    except IOError:
+        return False
+    return np.array_equal(source, vocabulary_source(vocabulary.path))
+
+class PhraseIndex(object):
+    """
+    Trie of the phrases in a Vocabulary, matching phrases with at most max_length words.
+    """
+    def __init__(self, vocabulary, max_length):
+        self.vocabulary = vocabulary
+        self.max_length = max_length
+
+        path = os.path.join(vocabulary.path, PHRASE_DIR)
+        if not has_phrase_index(path, vocabulary):
+            write_phrase_index(path, vocabulary)
+
+        self.tokens = Vocabulary(path)
+        self.edges = np.load(os.path.join(path, EDGES_FILE), mmap_mode='r')
+        self.children = np.load(os.path.join(path, CHILDREN_FILE), mmap_mode='r')
+        self.node_rows = np.load(os.path.join(path, NODE_ROWS_FILE), mmap_mode='r')
+
+    def child(self, node, token):
+        """
+        Return the child of node for token, or -1.
+        """
+        key = node*len(self.tokens) + token
+        i = int(self.edges.searchsorted(key))
+        if i < len(self.edges) and self.edges.item(i) == key:
+            return self.children.item(i)
+        return -1
+
+    def match(self, sentence, lengths):
+        """
+        Return the rows of all phrases in sentence whose length (in words) is in lengths.
+        """
+        tokens = self.tokens.lookup(sentence).tolist()
+        node_row = self.node_rows.item
+        matches = []
+        for start in xrange(len(tokens)-1):
+            node = 0
+            for end in xrange(start, min(start+self.max_length, len(tokens))):
+                if tokens[end] < 0:
+                    break
+                node = self.child(node, tokens[end])
+                if node < 0:
+                    break
+                if node_row(node) >= 0 and end-start+1 in lengths:
+                    matches.append(node_row(node))
+        return matches
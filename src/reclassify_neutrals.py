@@ -3,7 +3,6 @@
 __author__ = 'Johannes Bjerva'
 __email__  = 'j.bjerva@rug.nl'
 
-from sklearn import svm
 from collections import defaultdict
 import config
 
@@ -46,6 +45,7 @@ def read_gold():
     return training, targets, old, wait
 
 def train(X, y, old, trial_order):
+    from sklearn import svm  # Imported here, sklearn is slow to import
 
     # Split where test data ends
     split = len(X)-len(trial_order)
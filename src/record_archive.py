@@ -0,0 +1,107 @@
+#!/usr/bin/python
+
+"""
+Indexed binary archive of pickled records.
+
+Replaces the protocol 0 sPickle stream for the corpus cache.
+Each record is stored as an 8-byte length followed by the record
+pickled with the highest protocol. An index file holds the offset
+and key of every record, so single records, ranges of records,
+or a worker's shard can be read without deserialising the rest.
+"""
+
+import os
+import mmap
+import struct
+
+try:
+    from cPickle import dumps, loads, dump, load, HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dumps, loads, dump, load, HIGHEST_PROTOCOL
+
+LENGTH = struct.Struct('<Q')
+
+def index_path(path):
+    return path+'.index'
+
+def write_archive(path, records, key=lambda record: record[0]):
+    """
+    Write an iterable of records to path, indexed by key(record).
+    The records are written to a temporary file, which replaces the data
+    only after the old index is removed, and the index is written last,
+    so an interrupted (re)write never leaves an index over other data.
+    An archive without index is not opened.
+    """
+    keys = []
+    offsets = [0]
+    with open(path+'.tmp', 'wb') as out_f:
+        for record in records:
+            data = dumps(record, HIGHEST_PROTOCOL)
+            out_f.write(LENGTH.pack(len(data)))
+            out_f.write(data)
+            keys.append(str(key(record)))
+            offsets.append(offsets[-1]+LENGTH.size+len(data))
+
+    if os.path.isfile(index_path(path)):
+        os.remove(index_path(path))
+    os.rename(path+'.tmp', path)
+    with open(index_path(path)+'.tmp', 'wb') as out_f:
+        dump({'keys':keys, 'offsets':offsets}, out_f, HIGHEST_PROTOCOL)
+    os.rename(index_path(path)+'.tmp', index_path(path))
+
+class RecordArchive(object):
+    """
+    Read access to an archive written by write_archive.
+    Raises IOError if there is no (complete) archive at path.
+    """
+    def __init__(self, path):
+        with open(index_path(path), 'rb') as in_f:
+            index = load(in_f)
+        self.keys = index['keys']
+        self.offsets = index['offsets']
+        self.positions = dict((key, i) for i, key in enumerate(self.keys))
+
+        self.data = ''
+        if self.offsets[-1] > 0:
+            with open(path, 'rb') as in_f:
+                self.data = mmap.mmap(in_f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def read(self, i):
+        start = self.offsets[i] + LENGTH.size
+        return loads(self.data[start:self.offsets[i+1]])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.read(j) for j in xrange(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('record index out of range')
+        return self.read(i)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self.read(i)
+
+    def get(self, key, default=None):
+        """
+        Return the record with the given key (e.g. a pair id).
+        """
+        i = self.positions.get(str(key))
+        return default if i is None else self.read(i)
+
+    def read_range(self, start, stop):
+        """
+        Return the records start..stop-1 as a list.
+        """
+        return [self.read(i) for i in xrange(start, min(stop, len(self)))]
+
+    def shard(self, num, total):
+        """
+        Return shard num (0-based) of total contiguous shards.
+        """
+        size = -(-len(self) // total)
+        return self.read_range(num*size, (num+1)*size)
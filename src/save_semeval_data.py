@@ -7,7 +7,6 @@ Data saving module for SemEval Shared Task 1.
 __author__ = 'Johannes Bjerva'
 __email__  = 'j.bjerva@rug.nl'
 
-import pylab as pl
 import numpy as np
 import config
 
@@ -32,6 +31,7 @@ def write_for_evaluation(outputs, sick_ids):
 
 
 def plot_deviation(outputs, actual):
+    import pylab as pl  # Imported here, since matplotlib takes seconds to import
     pl.figure(figsize=(12, 6))
     pl.subplot(1, 2, 1)
     pl.title('Comparison')
@@ -58,6 +58,7 @@ def plot_results(regr, params, X_test, y_test, feature_names):
     Plot the results from boosting iterations
     and feature evaluations, using PyLab.
     """
+    import pylab as pl
     ###############################################################################
     # Plot training deviance
     # Compute test set deviance
@@ -14,9 +14,9 @@ Firstly, you need to have the following libraries installed:
 Secondly, you need to have a file containing word embeddings
 as generated by word2vec, in txt format.
 Using this will take a long time the first run, 
-but this will be binarized after the first loading, 
-cutting loading time to a few seconds.
-Also note that the memory requirements for this is quite high (~8gig).
+but this will be binarized into a memory-mapped store after the first loading,
+so that later runs open it instantly and only read the rows they use.
+Note that the first conversion still needs quite a lot of memory (~8gig).
 Running on e.g. Zardoz is recommended.
 
 Thirdly, you need to have the SICK data files.
@@ -33,18 +33,22 @@ __email__  = 'j.bjerva@rug.nl'
 
 import os
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 
 import load_semeval_data
 import save_semeval_data
 import feature_extraction
+import feature_cache
 import error_diagnostic
 import config
 
+from feature_cache import Feature
+
 def regression(X_train, y_train, X_test, y_test):
     """
 Train the regressor from Scikit-Learn.
 """
+    from sklearn.ensemble import RandomForestRegressor  # Imported here, sklearn is slow to import
+
     # Random forest regressor w/ param optimization
     params = {'n_estimators':1000, 'criterion':'mse', 'max_depth':20, 'min_samples_split':1, #'estimators':400, depth:20
               'min_samples_leaf':1, 'max_features':3, 'bootstrap':True, 'oob_score':False, #'max_features':'log2'
@@ -67,109 +71,93 @@ Train the regressor from Scikit-Learn.
     
     return regr
 
+fe = feature_extraction
+
+def tokens(line):
+    """
+    Token ids of t and h from the corpus store
+    """
+    return fe.corpus.get().pair(line.id)
+
+def cache_sentence_vectors(lines):
+    """
+    Compute all sentence vectors for SEN_DIS in one go
+    """
+    fe.cache_sentence_vectors([sentence for line in lines for sentence in (line.t_lemmas, line.h_lemmas)])
+
+def sentence_distances(lines):
+    """
+    SEN_DIS of all lines at once
+    """
+    return fe.sentence_distances([(line.t_lemmas, line.h_lemmas) for line in lines])
+
+# Features, in the order of the columns of the feature matrix.
+# Comment out / add lines to disable / add features.
+# List the config settings a feature depends on, so that its cached column is recomputed
+# when they change (changes to the code it uses are found by feature_cache.py),
+# and the resources it uses, which are loaded once before the worker processes start.
+features = [
+    Feature(['WORDS2'], lambda line: fe.word_overlap2(tokens(line).t, tokens(line).h, fe.stop_ids.get()),           # Proportion of word overlap
+            settings=('stop_list',), resources=(fe.corpus, fe.stop_ids)),
+    Feature(['WORDS3'], lambda line: fe.word_overlap3(tokens(line).t, tokens(line).h, fe.corpus.get().variants(line.id)), # Proportion of word overlap with the help of paraphrases
+            resources=(fe.corpus,)),
+    Feature(['SEN_LEN'], lambda line: fe.sentence_lengths(tokens(line).t, tokens(line).h),                           # Proportion of difference in sentence length
+            resources=(fe.corpus,)),
+    Feature(['SEN_DIS'], lambda line: fe.sentence_distance(line.t_lemmas, line.h_lemmas),                            # Cosine distance between sentences
+            settings=('vector_num', 'USE_EMBEDDING_SUBSET', 'EMBEDDING_PRECISION', 'MAX_PHRASE_LENGTH', 'USE_BIGRAMS', 'USE_TRIGRAMS'),
+            resources=(fe.embeddings, fe.phrase_index), prepare=cache_sentence_vectors, batch=sentence_distances),
+    Feature(['SYN_OV'], lambda line: fe.synset_overlap(line.t, line.h, line.variants),                               # Proportion of synset lemma overlap
+            resources=(fe.synset_lemmas,)),
+    Feature(['SYN_DIS'], lambda line: fe.synset_distance(line.t, line.h, line.variants),                             # Synset distance (Does not seem to help much?)
+            resources=(fe.synset_similarities,)),
+    Feature(['INS_OV'], lambda line: fe.instance_overlap(line.kt_mod, line.kh_mod, line.kth_mod, line.variants)),    # Instances overlap with the help of paraphrases
+    Feature(['REL_OV'], lambda line: fe.relation_overlap(line.kt_mod, line.kh_mod, line.kth_mod, line.variants)),    # Relation overlap in models with the help of paraphrases
+    #Feature(['DRS'], lambda line: fe.abs(line.kth_mod, line.t_tags)),                                               # DRS Complexity
+    Feature(['NOUN_OV'], lambda line: fe.noun_overlap(line.t_tags, line.h_tags, line.variants)),                     # Proportion of noun overlap
+    Feature(['VERB_OV'], lambda line: fe.verb_overlap(line.t_tags, line.h_tags, line.variants)),                     # Proportion of verb overlap
+    #Feature(['AG_OV'], lambda line: fe.agent_overlap(line.t_drs, line.h_drs, line.variants)),                       # Proportion of agent overlap
+    Feature(['PAT_OV'], lambda line: fe.patient_overlap(line.t_drs, line.h_drs, line.variants)),                     # Proportion of patient overlap
+    Feature(['PRED_OV'], lambda line: fe.pred_overlap(line.t_drs, line.h_drs)),                                      # Proportion of drs predicate overlap
+    Feature(['DRS_OV'], lambda line: fe.drs(line.t_drs, line.h_drs)),
+    #Feature(['TRIP_OV'], lambda line: fe.triple_overlap(line.t_drs, line.h_drs, line.variants)),                    # Proportion of drs relation triple overlap
+    Feature(['TIDF'], lambda line: fe.tfidf(line.t_tok, line.h_tok),                                                 # Word overlap using tfidf-scores
+            resources=(fe.term_statistics,)),
+    Feature(['PROV',                                        # prover output
+             'DOM_NV',                                      # domain novelty
+             'REL_NV',                                      # relation novelty
+             'WN_NV',                                       # wordnet novelty
+             'MOD_NV',                                      # model novelty
+             'WORDS1',                                      # word overlap
+             'PRED'],                                       # prediction.txt
+            lambda line: fe.get_johans_features(line.modsizedif, line.prediction, line.id)),
+    #Feature(['REL_J'], lambda line: fe.get_prediction_judgement(line.id),                                           # johans relatedness prediction
+    #        files=('working/sick.run',)),
+    Feature(['ID'], lambda line: line.id),
+    Feature(['ID2'], lambda line: fe.id(line.id)),
+    Feature(['ID3'], lambda line: fe.id2(line.id)),
+    Feature(['ENT_A', 'ENT_B', 'ENT_C'], lambda line: fe.entailment_judgements.get()[str(line.id)],                  # Johan's entailment judgement
+            files=('working/sick.run',), resources=(fe.entailment_judgements,)),
+]
+
 # Array containing the names of all features, for plotting purposes
-feature_names = np.array([
-    'WORDS2', 
-    'WORDS3', 
-    'SEN_LEN',
-    'SEN_DIS', 
-    'SYN_OV', 
-    'SYN_DIS',
-    'INS_OV',
-    'REL_OV',
-    #'DRS',
-    'NOUN_OV',
-    'VERB_OV',
-    #'AG_OV',
-    'PAT_OV',
-    'PRED_OV',
-    'DRS_OV',
-    'TIDF',
-    'PROV',
-    'DOM_NV', 
-    'REL_NV', 
-    'WN_NV',
-    'MOD_NV',
-    'WORDS1',
-    'PRED',
-    #'REL_J',
-    'ID',
-    'ID2',
-    'ID3',
-    'ENT_A',
-    'ENT_B',
-    'ENT_C',
-    'dummy'
-    ], dtype='|S7')
+feature_names = np.array([name for feature in features for name in feature.names], dtype='|S7')
+
 def get_features(line):
     """
-    Feature extraction.
-    Comment out / add lines to disable / add features.
-    Add the name to the feature_names array.
+    Feature extraction, for a single pair (without the column cache).
     """
-    johans_features = feature_extraction.get_johans_features(line[11],line[12], line[0])
-    features = [
-        float(feature_extraction.word_overlap2(line[2], line[3])),                       # Proportion of word overlap
-        float(feature_extraction.word_overlap3(line[2], line[3], line[17])),             # Proportion of word overlap with the help of paraphrases
-        float(feature_extraction.sentence_lengths(line[2], line[3])),                    # Proportion of difference in sentence length    
-        float(feature_extraction.sentence_distance(line[13], line[14])),                 # Cosine distance between sentences
-        float(feature_extraction.synset_overlap(line[2], line[3], line[17])),            # Proportion of synset lemma overlap
-        float(feature_extraction.synset_distance(line[2], line[3], line[17])),           # Synset distance (Does not seem to help much?)
-        float(feature_extraction.instance_overlap(line[6], line[7], line[8], line[17])), # Instances overlap with the help of paraphrases
-        float(feature_extraction.relation_overlap(line[6], line[7], line[8], line[17])), # Relation overlap in models with the help of paraphrases
-        #float(feature_extraction.abs(line[8], line[9]),                                 # DRS Complexity    
-        float(feature_extraction.noun_overlap(line[9], line[10], line[17])),             # Proportion of noun overlap
-        float(feature_extraction.verb_overlap(line[9], line[10], line[17])),             # Proportion of verb overlap
-        #float(feature_extraction.agent_overlap(line[15], line[16], line[17])),          # Proportion of agent overlap
-        float(feature_extraction.patient_overlap(line[15], line[16], line[17])),         # Proportion of patient overlap
-        float(feature_extraction.pred_overlap(line[15], line[16])),                      # Proportion of drs predicate overlap
-        float(feature_extraction.drs(line[15], line[16])),
-        float(feature_extraction.tfidf(line[4], line[5])),                               # Word overlap using tfidf-scores
-                                       
-        float(johans_features[0]),                             # prover output
-        float(johans_features[1]),                             # domain novelty
-        float(johans_features[2]),                             # relation novelty
-        float(johans_features[3]),                             # wordnet novelty                
-        float(johans_features[4]),                             # model novelty
-        float(johans_features[5]),                             # word overlap
-        float(johans_features[6]),                             # prediction.txt
-        #float(feature_extraction.get_prediction_judgement(line[0]))  # johans relatedness prediction
-        float(line[0]),
-        float(feature_extraction.id(line[0])),
-        float(feature_extraction.id2(line[0]))
-    ]
-    features.extend(feature_extraction.entailment_judgements[str(line[0])])
-    
-    return features
+    return [value for feature in features for value in feature.values(line)]
 
 def retrieve_features(sick_train, sick_test):
     """
-    Retrieve feature vectors, either by recalculating from text-files,
-    or by loading from a pre-saved binary.
+    Retrieve feature vectors, computing only the features that are not cached yet,
+    or that changed since they were cached.
     """
-    if config.RECALC_FEATURES:
-        # Extract training features and targets
-        print 'Feature extraction (train)...'
-        train_sources = np.array([get_features(line) for line in sick_train])
-        train_targets = np.array([float(line[1]) for line in sick_train])
-
-        # Extract trial features and targets
-        print 'Feature extraction (trial)...'
-        trial_sources = np.array([get_features(line) for line in sick_test])
-        trial_targets = [];#np.array([float(line[1]) for line in sick_test])
-
-        # Store to pickle for future reference
-        with open('features_np.pickle', 'wb') as out_f:
-            np.save(out_f, train_sources)
-            np.save(out_f, train_targets)
-            np.save(out_f, trial_sources)
-            np.save(out_f, trial_targets)
-    else:
-        with open('features_np.pickle', 'rb') as in_f:
-            train_sources = np.load(in_f)
-            train_targets = np.load(in_f)
-            trial_sources = np.load(in_f)
-            trial_targets = np.load(in_f)
+    sources = feature_cache.feature_matrix(features, sick_train+sick_test, config.RECALC_FEATURES)
+    train_sources = sources[:len(sick_train)]
+    train_targets = np.array([float(line.gold) for line in sick_train])
+    trial_sources = sources[len(sick_train):]
+    trial_targets = [];#np.array([float(line.gold) for line in sick_test])
 
     return train_sources, train_targets, trial_sources, trial_targets
 
@@ -193,18 +181,18 @@ def main():
     outputs = clf.predict(trial_sources)
 
     # Evaluate regressor
-    save_semeval_data.write_for_evaluation(outputs, [line[0] for line in sick_test]) #Outputs and sick_ids
+    save_semeval_data.write_for_evaluation(outputs, [line.id for line in sick_test]) #Outputs and sick_ids
 
     # Check errors
-    error_diagnostic.output_errors(outputs, trial_targets, [line[0] for line in sick_test], [line[1:3] for line in sick_test]) #Outputs and sick_ids
+    error_diagnostic.output_errors(outputs, trial_targets, [line.id for line in sick_test], [line[1:3] for line in sick_test]) #Outputs and sick_ids
 
     # Plot deviations
     save_semeval_data.plot_deviation(outputs, trial_targets)
 
     # Write to MESH
     if config.WRITE_TO_MESH:
-        save_semeval_data.write_to_mesh(train_sources, train_targets, [line[0] for line in sick_train], True) #sick_ids
-        save_semeval_data.write_to_mesh(trial_sources, trial_targets, [line[0] for line in sick_test], False) #sick_ids
+        save_semeval_data.write_to_mesh(train_sources, train_targets, [line.id for line in sick_train], True) #sick_ids
+        save_semeval_data.write_to_mesh(trial_sources, trial_targets, [line.id for line in sick_test], False) #sick_ids
 
     # Run the evaluation script
     os.system('R --no-save --slave --vanilla --args working/foo.txt working/SICK_test_annotated.txt < working/sick_evaluation.R')
@@ -0,0 +1,144 @@
+#!/usr/bin/python
+
+"""
+Path similarity matrix for the synset distance feature (SYN_DIS).
+
+SYN_DIS compares the first noun sense (word.n.01) of every word of t with
+that of every word of h. Instead of asking WordNet for each comparison,
+the path similarities between the first noun senses of all corpus words
+are computed once, with the ancestor index (see ancestor_index.py), and
+saved as a matrix. Each word maps to the row of its sense (-1 if it has
+none), so SYN_DIS is a max over a slice of the matrix. When new corpus words
+are added, only the similarities involving their senses are computed.
+Words outside the corpus (e.g. of new sentences to score) are not added to
+the matrix: their similarities are computed with the ancestor index when needed.
+"""
+
+import os
+import numpy as np
+
+from itertools import chain
+
+try:
+    from cPickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+
+from ancestor_index import AncestorIndex
+
+MATRIX_FILE = 'matrix.npy'
+WORDS_FILE = 'words.pickle'
+
+def first_sense(wn, word):
+    """
+    Return the first noun sense of word, or None.
+    """
+    from nltk.corpus.reader.wordnet import WordNetError
+    try:
+        return wn.synset('{0}.n.01'.format(word))
+    except WordNetError:
+        return None
+
+class SimilarityIndex(object):
+    """
+    Word -> row of its first noun sense, and the path similarities between all senses.
+    """
+    def __init__(self, words=None, senses=None, ancestors=None, matrix=None):
+        self.words = words or {}        # word -> row, or -1 if it has no noun sense
+        self.senses = senses or []      # row -> id of the sense in the ancestor index
+        self.ancestors = ancestors or AncestorIndex()
+        self.matrix = matrix if matrix is not None else np.zeros((0, 0))
+        self.extra = {}                 # word not in the matrix -> id of its sense, or -1, see lookup
+
+    def __contains__(self, word):
+        return word in self.words or word in self.extra
+
+    def add(self, words, wn):
+        """
+        Look up the first noun sense of words, and compute the similarities of new senses to all senses.
+        """
+        rows = dict((sense, i) for i, sense in enumerate(self.senses))
+        old_size = len(self.senses)
+        for word in words:
+            synset = first_sense(wn, word)
+            if synset is None:
+                self.words[word] = -1
+                continue
+            sense = self.ancestors.add(synset)
+            if sense not in rows:
+                rows[sense] = len(self.senses)
+                self.senses.append(sense)
+            self.words[word] = rows[sense]
+        if len(self.senses) == old_size:
+            return
+
+        matrix = np.zeros((len(self.senses), len(self.senses)))
+        matrix[:old_size, :old_size] = self.matrix
+        for i in xrange(old_size, len(self.senses)):
+            row = self.ancestors.path_similarities(self.senses[i], self.senses)
+            matrix[i, :] = row
+            matrix[:, i] = row
+        self.matrix = matrix
+
+    def lookup(self, words, wn):
+        """
+        Look up the first noun sense of words, without adding them to the matrix.
+        """
+        for word in words:
+            synset = first_sense(wn, word)
+            self.extra[word] = -1 if synset is None else self.ancestors.add(synset)
+
+    def sense(self, word):
+        row = self.words.get(word)
+        if row is None:
+            return self.extra[word]
+        return self.senses[row] if row >= 0 else -1
+
+    def max_similarities(self, sentence_a, sentence_b):
+        """
+        Return, for each word of sentence_a, its highest similarity to a word of sentence_b
+        (0.0 if it has no noun sense, or none of sentence_b has).
+        """
+        words = self.words
+        if not all(word in words for word in chain(sentence_a, sentence_b)):
+            # Words outside the corpus (see lookup), computed from the ancestor index
+            columns = [sense for sense in (self.sense(word) for word in sentence_b) if sense >= 0]
+            return [max(0.0, float(self.ancestors.path_similarities(sense, columns).max())) if sense >= 0 and columns else 0.0
+                    for sense in (self.sense(word) for word in sentence_a)]
+
+        rows = [self.words[word] for word in sentence_a]
+        columns = [column for column in (self.words[word] for word in sentence_b) if column >= 0]
+        known = [row for row in rows if row >= 0]
+        if not columns or not known:
+            return [0.0] * len(rows)
+
+        maxima = iter(self.matrix[np.ix_(known, columns)].max(axis=1).tolist())
+        return [max(0.0, next(maxima)) if row >= 0 else 0.0 for row in rows]
+
+def load_index(path, source=None):
+    """
+    Load the index saved at path (memory-mapped), or return an empty one if there is none,
+    or if it was built from other WordNet data than source.
+    """
+    try:
+        with open(os.path.join(path, WORDS_FILE), 'rb') as in_f:
+            words, senses, ancestors, saved_source = load(in_f)
+        if saved_source == source:
+            return SimilarityIndex(words, senses, ancestors, np.load(os.path.join(path, MATRIX_FILE), mmap_mode='r'))
+    except (IOError, EOFError, UnpicklingError, ValueError):
+        pass
+    return SimilarityIndex()
+
+def save_index(path, index, source=None):
+    """
+    Save the index at path, with the source (WordNet data) it was built from.
+    The words are written last and mark it as complete.
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    with open(os.path.join(path, MATRIX_FILE+'.tmp'), 'wb') as out_f:
+        np.save(out_f, index.matrix)
+    os.rename(os.path.join(path, MATRIX_FILE+'.tmp'), os.path.join(path, MATRIX_FILE))
+    with open(os.path.join(path, WORDS_FILE+'.tmp'), 'wb') as out_f:
+        dump((index.words, index.senses, index.ancestors, source), out_f, HIGHEST_PROTOCOL)
+    os.rename(os.path.join(path, WORDS_FILE+'.tmp'), os.path.join(path, WORDS_FILE))
@@ -0,0 +1,109 @@
+#!/usr/bin/python
+
+"""
+Synset lemma table for the synset overlap feature (SYN_OV).
+
+Instead of probing WordNet for the senses of every word of every sentence,
+the lemma names of the first SENSES noun senses of each word in the corpus
+are looked up once, in bulk. Lemma names are stored as int ids, so the
+lemmas of a word are a frozenset of ints, and the overlap of two sentences
+is an integer set intersection. The table is saved as a pickle.
+"""
+
+import os
+
+try:
+    from cPickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+
+SENSES = 10     # Noun senses per word
+
+def value(attribute):
+    # Synset.lemmas and Lemma.name are methods in nltk 3, attributes before
+    return attribute() if callable(attribute) else attribute
+
+def sense_lemmas(wn, word):
+    """
+    Return the lemma names of the first SENSES noun senses (word.n.01, word.n.02, ..) of word.
+    """
+    from nltk.corpus.reader.wordnet import WordNetError
+
+    names = []
+    for i in xrange(1, SENSES+1):
+        try:
+            synset = wn.synset('{0}.n.{1:02d}'.format(word, i))
+        except WordNetError:
+            break   # Senses are numbered consecutively
+        names += [value(lemma.name) for lemma in value(synset.lemmas)]
+    return names
+
+class SynsetTable(object):
+    """
+    Word -> frozenset of lemma name ids.
+    """
+    def __init__(self):
+        self.names = []     # lemma name id -> lemma name
+        self.ids = {}       # lemma name -> lemma name id
+        self.words = {}
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def add(self, words, wn):
+        """
+        Look up the sense lemmas of words in WordNet.
+        """
+        for word in words:
+            lemma_ids = []
+            for name in sense_lemmas(wn, word):
+                i = self.ids.get(name)
+                if i is None:
+                    i = self.ids[name] = len(self.names)
+                    self.names.append(name)
+                lemma_ids.append(i)
+            self.words[word] = frozenset(lemma_ids)
+
+    def lemma_ids(self, sentence):
+        """
+        Return the set of lemma name ids of all words in sentence.
+        """
+        words = self.words
+        return frozenset().union(*[words[word] for word in sentence])
+
+    def __getstate__(self):
+        return {'senses':SENSES, 'names':self.names,
+                'words':dict((word, tuple(ids)) for word, ids in self.words.iteritems())}
+
+    def __setstate__(self, state):
+        self.names = state['names']
+        self.ids = dict((name, i) for i, name in enumerate(self.names))
+        self.words = {}
+        # A table with a different number of senses is rebuilt
+        if state['senses'] == SENSES:
+            self.words = dict((word, frozenset(ids)) for word, ids in state['words'].iteritems())
+
+def load_table(path, source=None):
+    """
+    Load the table saved at path, or return an empty one if there is none,
+    or if it was built from other WordNet data than source.
+    """
+    try:
+        with open(path, 'rb') as in_f:
+            saved_source, table = load(in_f)
+        if saved_source == source:
+            return table
+    except (IOError, EOFError, UnpicklingError, ValueError, TypeError):
+        pass
+    return SynsetTable()
+
+def save_table(path, table, source=None):
+    """
+    Save the table at path, with the source (WordNet data) it was built from.
+    """
+    with open(path+'.tmp', 'wb') as out_f:
+        dump((source, table), out_f, HIGHEST_PROTOCOL)
+    os.rename(path+'.tmp', path)
@@ -0,0 +1,117 @@
+#!/usr/bin/python
+
+"""
+Term statistics of the sick corpus, for the tfidf feature.
+
+Replaces counting all t.tok and h.tok files on every run. Each
+(lowercased) term gets an id, with its term frequency (tf) and document
+(sentence) frequency (df). The contribution of every pair is kept with
+a fingerprint of its files, so when pairs are added, changed or removed,
+only their counts are updated. The index is saved as one pickle.
+"""
+
+import os
+import numpy as np
+
+try:
+    from cPickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+except ImportError:
+    from pickle import dump, load, UnpicklingError, HIGHEST_PROTOCOL
+
+class TermIndex(object):
+    """
+    Term id -> tf, df, plus the total number of words and sentences.
+    """
+    def __init__(self):
+        self.terms = []         # term id -> term
+        self.ids = {}           # term -> term id
+        self.tf = []
+        self.df = []
+        self.total_words = 0
+        self.total_sentences = 0
+        self.pairs = {}         # key -> (fingerprint, tf term ids, df term ids, words, sentences)
+        self.weights = None
+
+    def term_id(self, term):
+        i = self.ids.get(term)
+        if i is None:
+            i = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+            self.tf.append(0)
+            self.df.append(0)
+        return i
+
+    def fingerprint(self, key):
+        return self.pairs[key][0] if key in self.pairs else None
+
+    def add_pair(self, key, fingerprint, sentences):
+        """
+        Count the sentences (lists of words) of a pair.
+        As in the original count, a word in a sentence adds one to its df
+        for every distinct casing of it.
+        """
+        self.remove_pair(key)
+        tf_ids = [self.term_id(word.lower()) for sentence in sentences for word in sentence]
+        df_ids = [self.term_id(word.lower()) for sentence in sentences for word in set(sentence)]
+        for i in tf_ids:
+            self.tf[i] += 1
+        for i in df_ids:
+            self.df[i] += 1
+        words = len(tf_ids)
+        self.total_words += words
+        self.total_sentences += len(sentences)
+        self.pairs[key] = (fingerprint, tf_ids, df_ids, words, len(sentences))
+        self.weights = None
+
+    def remove_pair(self, key):
+        if key not in self.pairs:
+            return
+        _, tf_ids, df_ids, words, sentences = self.pairs.pop(key)
+        for i in tf_ids:
+            self.tf[i] -= 1
+        for i in df_ids:
+            self.df[i] -= 1
+        self.total_words -= words
+        self.total_sentences -= sentences
+        self.weights = None
+
+    def index(self, term):
+        """
+        Return the id of a term occurring in the corpus, or -1.
+        """
+        i = self.ids.get(term, -1)
+        return i if i >= 0 and self.df[i] > 0 else -1
+
+    def get_weights(self):
+        """
+        Return the tfidf weight of each term id, (total_sentences - tf) / total_sentences.
+        """
+        if self.weights is None:
+            total = float(self.total_sentences)
+            self.weights = (total - np.array(self.tf, dtype=np.float64)) / total if total else np.zeros(len(self.tf))
+        return self.weights
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['ids'], state['weights']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.ids = dict((term, i) for i, term in enumerate(self.terms))
+        self.weights = None
+
+def load_index(path):
+    """
+    Load the index saved at path, or return an empty one.
+    """
+    try:
+        with open(path, 'rb') as in_f:
+            return load(in_f)
+    except (IOError, EOFError, UnpicklingError):
+        return TermIndex()
+
+def save_index(path, index):
+    with open(path+'.tmp', 'wb') as out_f:
+        dump(index, out_f, HIGHEST_PROTOCOL)
+    os.rename(path+'.tmp', path)
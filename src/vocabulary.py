@@ -0,0 +1,161 @@
+#!/usr/bin/python
+
+"""
+Compact, read-only vocabulary for the embedding store.
+
+Replaces the word->id dict, which costs several GB for millions of words.
+The words are kept sorted in one string blob with an offset array,
+and an open addressing hash table (crc32, linear probing) maps a word
+to its position in the blob. All parts are plain files that are
+memory-mapped, so opening a vocabulary does not read it.
+"""
+
+import os
+import mmap
+import numpy as np
+
+from zlib import crc32
+
+BLOB_FILE = 'vocab.blob'
+OFFSETS_FILE = 'vocab_offsets.npy'
+ROWS_FILE = 'vocab_rows.npy'
+TABLE_FILE = 'vocab_table.npy'
+
+def word_hash(word):
+    if isinstance(word, unicode):
+        word = word.encode('utf-8')
+    return crc32(word) & 0xffffffff
+
+def build_table(hashes):
+    """
+    Build a linear probing hash table holding the index of each hash.
+    Instead of inserting one word at a time, every round places all words
+    whose current slot is still free (the first one if several want the same slot)
+    and moves the others on to their next slot.
+    """
+    size = 2
+    while size < 2*len(hashes):
+        size *= 2
+    mask = size - 1
+
+    table = np.empty(size, dtype=np.int32)
+    table.fill(-1)
+    pending = np.arange(len(hashes), dtype=np.int64)
+    slots = hashes & mask
+    while len(pending):
+        free = np.flatnonzero(table[slots] < 0)
+        claimed, first = np.unique(slots[free], return_index=True)
+        table[claimed] = pending[free[first]]
+
+        placed = np.zeros(len(pending), dtype=bool)
+        placed[free[first]] = True
+        pending = pending[~placed]
+        slots = (slots[~placed] + 1) & mask
+
+    return table
+
+def write_vocabulary(path, words):
+    """
+    Write the vocabulary files for words (given in row order) at path.
+    The hash table of a previous vocabulary is removed first, and the new one
+    is written last and marks the vocabulary as complete.
+    """
+    if os.path.isfile(os.path.join(path, TABLE_FILE)):
+        os.remove(os.path.join(path, TABLE_FILE))
+
+    order = sorted(xrange(len(words)), key=words.__getitem__)
+    sorted_words = [words[i] for i in order]
+
+    with open(os.path.join(path, BLOB_FILE), 'wb') as out_f:
+        out_f.write(''.join(sorted_words))
+
+    offsets = np.zeros(len(words)+1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(word) for word in sorted_words])
+    np.save(os.path.join(path, OFFSETS_FILE), offsets)
+    np.save(os.path.join(path, ROWS_FILE), np.array(order, dtype=np.int64))
+
+    hashes = np.array([word_hash(word) for word in sorted_words], dtype=np.int64)
+    with open(os.path.join(path, TABLE_FILE+'.tmp'), 'wb') as out_f:
+        np.save(out_f, build_table(hashes))
+    os.rename(os.path.join(path, TABLE_FILE+'.tmp'), os.path.join(path, TABLE_FILE))
+
+def has_vocabulary(path):
+    return os.path.isfile(os.path.join(path, TABLE_FILE))
+
+class Vocabulary(object):
+    """
+    Memory-mapped word->row mapping with the in/get/[] semantics of a dict,
+    and lookup() to find the rows of a list of words in one call.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode='r')
+        self.rows = np.load(os.path.join(path, ROWS_FILE), mmap_mode='r')
+        self.table = np.load(os.path.join(path, TABLE_FILE), mmap_mode='r')
+        self.mask = len(self.table) - 1
+
+        self.blob = ''
+        if self.offsets[-1] > 0:
+            with open(os.path.join(path, BLOB_FILE), 'rb') as in_f:
+                self.blob = mmap.mmap(in_f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def index(self, word):
+        """
+        Return the position of word in the sorted vocabulary, or -1.
+        """
+        if isinstance(word, unicode):
+            word = word.encode('utf-8')
+        elif not isinstance(word, str):
+            return -1
+
+        # item() returns plain ints, which is much faster than numpy scalars here
+        table = self.table.item
+        offset = self.offsets.item
+        mask = self.mask
+        slot = word_hash(word) & mask
+        i = table(slot)
+        while i >= 0:
+            start = offset(i)
+            end = offset(i+1)
+            if end-start == len(word) and self.blob[start:end] == word:
+                return i
+            slot = (slot + 1) & mask
+            i = table(slot)
+        return -1
+
+    def lookup(self, words):
+        """
+        Return an array with the row of each word, -1 for unknown words.
+        """
+        indices = np.array([self.index(word) for word in words], dtype=np.int64)
+        rows = np.empty(len(indices), dtype=np.int64)
+        rows.fill(-1)
+        found = indices >= 0
+        rows[found] = self.rows[indices[found]]
+        return rows
+
+    def word(self, i):
+        """
+        Return the i-th word in sorted order.
+        """
+        return self.blob[self.offsets.item(i):self.offsets.item(i+1)]
+
+    def get(self, word, default=None):
+        i = self.index(word)
+        return int(self.rows[i]) if i >= 0 else default
+
+    def __getitem__(self, word):
+        i = self.index(word)
+        if i < 0:
+            raise KeyError(word)
+        return int(self.rows[i])
+
+    def __contains__(self, word):
+        return self.index(word) >= 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self.word(i)